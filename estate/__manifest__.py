@@ -15,10 +15,13 @@
         "views/estate_property_tag.xml",
         "wizard/estate_property_mass_update_wizard_view.xml",
         "wizard/estate_sold_report_view.xml",
+        "report/estate_property_sale_analysis_views.xml",
         "views/estate_menus.xml",
         "views/base.view_users_form.xml",
         "data/property_type_data.xml",
         "data/estate_property_offer_cron.xml",
+        "data/estate_sold_report_cron.xml",
+        "data/estate_property_mass_update_cron.xml",
         "report/property_offer_template.xml",
         "report/property_offer_reports.xml",
         "report/top_property_template.xml",
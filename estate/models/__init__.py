@@ -3,3 +3,4 @@ from . import estate_property_type
 from . import estate_property_tag
 from . import estate_property_offer
 from . import inherited_model
+from . import estate_property_offer_price_history
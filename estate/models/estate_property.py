@@ -1,8 +1,14 @@
+import copy
+import logging
 from datetime import datetime, timedelta
 
+import psycopg2
+
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools import float_compare, html_escape
+from odoo.tools import SQL, float_compare, html_escape, ormcache, str2bool
+
+_logger = logging.getLogger(__name__)
 
 
 class EstateProperty(models.Model):
@@ -57,15 +63,16 @@ class EstateProperty(models.Model):
 
     offer_ids = fields.One2many(comodel_name="estate.property.offer", inverse_name="property_id", string="Offers")
 
-    total_area = fields.Float(compute="_compute_total_area")
+    total_area = fields.Float(compute="_compute_total_area", store=True, index=True)
 
-    best_price = fields.Float(compute="_compute_best_price", tracking=True)
+    best_price = fields.Float(readonly=True, index=True, copy=False)
 
     company_id = fields.Many2one("res.company", string="Company", required=True, default=lambda self: self.env.company)
 
     construction_year = fields.Integer(default=datetime.now().year)
 
-    age = fields.Char(compute="_compute_age")
+    # stored for sorting and grouping, rolled forward every new year by _cron_update_ages
+    age = fields.Integer(compute="_compute_age", store=True, index=True)
 
     discount_applied = fields.Boolean(default=False)
 
@@ -73,18 +80,20 @@ class EstateProperty(models.Model):
 
     original_price = fields.Float()
 
-    average_offer_price = fields.Float(compute="_compute_average_offer_price", store=True)
+    average_offer_price = fields.Float(readonly=True, copy=False)
+
+    offer_price_total = fields.Float(readonly=True, copy=False)
 
     price_per_sqm = fields.Float(compute="_compute_price_per_sqm", store=True)
 
     accept_highest_offer = fields.Boolean(default=False)
     cancel_highest_offer = fields.Boolean(default=False)
 
-    sold_date = fields.Date(copy=False)
+    sold_date = fields.Date(copy=False, index=True)
 
     is_favourite = fields.Boolean(string="Mark as Favorite", default=False)
 
-    offer_count = fields.Integer(compute="_compute_offer_count", store=True)
+    offer_count = fields.Integer(readonly=True, copy=False)
 
     unique_number = fields.Char(readonly=True)
 
@@ -93,12 +102,6 @@ class EstateProperty(models.Model):
         for record in self:
             record.total_area = record.living_area + record.garden_area
 
-    @api.depends("offer_ids")
-    def _compute_best_price(self):
-        for record in self:
-            prices = record.offer_ids.mapped("price")
-            record.best_price = max(prices) if prices else 0.0
-
     @api.onchange("garden")
     def _onchange_garden(self):
         if self.garden:
@@ -117,27 +120,38 @@ class EstateProperty(models.Model):
                 record.contact_email = False
 
     def estate_property_action_sold(self):
-        for record in self:
-            if record.state == "cancelled":
-                raise UserError(_("Cancelled property cannot be marked as sold."))
-            record.state = "sold"
-
-            record.message_post(
-                body=_("The property %s has been successfully sold!", html_escape(record.name)),
-                subtype_xmlid="mail.mt_note",
-            )
-
-            user = record.salesman_id or self.env.user
-            record.activity_schedule(
-                "mail.mail_activity_data_todo",
-                user_id=user.id,
-                summary=_("Property sold!"),
-                note=_(
-                    "The property %(name)s has been marked as sold by %(user)s",
-                    name=html_escape(record.name),
-                    user=html_escape(self.env.user.name),
-                ),
-            )
+        if any(record.state == "cancelled" for record in self):
+            raise UserError(_("Cancelled property cannot be marked as sold."))
+
+        self.write({"state": "sold"})
+        self.filtered(lambda r: not r.sold_date).write({"sold_date": fields.Date.today()})
+
+        self._message_log_batch(
+            bodies={
+                record.id: _("The property %s has been successfully sold!", html_escape(record.name)) for record in self
+            },
+        )
+
+        activity_type = self.env.ref("mail.mail_activity_data_todo")
+        res_model_id = self.env["ir.model"]._get_id("estate.property")
+        self.env["mail.activity"].create(
+            [
+                {
+                    "res_model_id": res_model_id,
+                    "res_id": record.id,
+                    "activity_type_id": activity_type.id,
+                    "user_id": (record.salesman_id or self.env.user).id,
+                    "date_deadline": activity_type._get_date_deadline(),
+                    "summary": _("Property sold!"),
+                    "note": _(
+                        "The property %(name)s has been marked as sold by %(user)s",
+                        name=html_escape(record.name),
+                        user=html_escape(self.env.user.name),
+                    ),
+                }
+                for record in self.sorted(lambda r: (r.salesman_id or self.env.user).id)
+            ]
+        )
 
     def estate_property_action_cancel(self):
         for record in self:
@@ -177,14 +191,33 @@ class EstateProperty(models.Model):
             if record.state not in ("new", "cancelled"):
                 raise UserError(_("Only New and Cancelled properties can be deleted."))
 
+    @api.depends("construction_year")
     def _compute_age(self):
-        current_year = datetime.now().year
+        current_year = fields.Date.today().year
         for record in self:
             if record.construction_year:
                 record.age = current_year - record.construction_year
             else:
                 record.age = 0
 
+    @api.model
+    def _cron_update_ages(self):
+        """Roll the stored ages forward to the current year with one UPDATE."""
+        self.flush_model(["construction_year", "age"])
+        self.env.cr.execute(
+            SQL(
+                """
+                UPDATE estate_property
+                   SET age = CASE WHEN COALESCE(construction_year, 0) = 0 THEN 0 ELSE %(year)s - construction_year END
+                 WHERE age IS DISTINCT FROM
+                       CASE WHEN COALESCE(construction_year, 0) = 0 THEN 0 ELSE %(year)s - construction_year END
+                """,
+                year=fields.Date.today().year,
+            )
+        )
+        _logger.info("Updated the age of %s properties", self.env.cr.rowcount)
+        self.invalidate_model(["age"])
+
     def action_apply_discount(self):
         for record in self:
             if record.discount_applied:
@@ -207,18 +240,6 @@ class EstateProperty(models.Model):
             record.expected_price = record.original_price
             record.discount_applied = False
 
-    @api.depends("offer_ids.price")
-    def _compute_average_offer_price(self):
-        for record in self:
-            offers = record.offer_ids
-            if offers:
-                total_sum = sum(offers.mapped("price"))
-                count = len(offers)
-                record.average_offer_price = total_sum / count
-
-            else:
-                record.average_offer_price = 0
-
     @api.depends("expected_price", "total_area")
     def _compute_price_per_sqm(self):
         for record in self:
@@ -227,27 +248,106 @@ class EstateProperty(models.Model):
             else:
                 record.price_per_sqm = 0
 
+    @api.model
+    def search_similar(self, term, limit=80):
+        """Return the properties whose name, description or postcode contain a word similar to ``term``,
+        best matches first. Falls back to a plain ILIKE search when pg_trgm is not installed.
+        """
+        if not self.env.registry.has_trigram:
+            return self.search(
+                ["|", "|", *[(fname, "ilike", term) for fname in self._TRIGRAM_SEARCH_FIELDS]], limit=limit
+            )
+
+        query = self._search([])
+        columns = [self._field_to_sql(self._table, fname, query) for fname in self._TRIGRAM_SEARCH_FIELDS]
+        # "<%" is the word similarity operator, served by the trigram indexes
+        query.add_where(SQL(" OR ").join(SQL("%s <%% %s", term, column) for column in columns))
+        query.order = SQL(
+            "GREATEST(%s) DESC, %s",
+            SQL(", ").join(SQL("word_similarity(%s, %s)", term, column) for column in columns),
+            SQL.identifier(self._table, "id"),
+        )
+        query.limit = limit
+        return self.browse(query.get_result_ids())
+
+    def _lock_for_offers(self):
+        """Lock the rows of these properties until the end of the transaction, in id order to avoid deadlocks.
+
+        Concurrent bids and acceptances of a property queue up here instead of interleaving their checks and
+        writes. Cursors run at REPEATABLE READ: a transaction that waited for a holder which changed the property
+        fails with a serialization error, and Odoo retries it with a snapshot that sees the holder's changes. Use
+        ``_run_in_auction`` to take the lock before the transaction starts and avoid those retries.
+        """
+        if not self:
+            return
+        self.env.cr.execute(
+            SQL("SELECT id FROM estate_property WHERE id IN %s ORDER BY id FOR UPDATE", tuple(sorted(self.ids)))
+        )
+        self.invalidate_recordset()
+        self.env["estate.property.offer"].invalidate_model()
+
+    # first key of the advisory locks taken by _run_in_auction, the second one is the property id
+    _AUCTION_LOCK_KEY = 4242
+
+    @api.model
+    def _run_in_auction(self, property_id, callback):
+        """Run ``callback(env)`` in a new transaction, started once the auction lock of the property is held.
+
+        The lock is a session advisory lock held by a separate connection until the transaction is committed or
+        rolled back, so the transaction takes its snapshot after the previous holder committed: contended bids
+        and acceptances of a listing then run one after another without serialization failures nor retries.
+        """
+        registry = self.env.registry
+        with registry.cursor() as lock_cr:
+            lock_cr.execute("SELECT pg_advisory_lock(%s, %s)", [self._AUCTION_LOCK_KEY, property_id])
+            try:
+                with registry.cursor() as cr:
+                    return callback(api.Environment(cr, self.env.uid, self.env.context))
+            finally:
+                lock_cr.execute("SELECT pg_advisory_unlock(%s, %s)", [self._AUCTION_LOCK_KEY, property_id])
+
+    def _get_best_offers(self):
+        """Return {property_id: offer} of the highest offer of each property, picked in one DISTINCT ON query."""
+        if not self:
+            return {}
+        Offer = self.env["estate.property.offer"]
+        Offer.flush_model(["property_id", "price"])
+        self.env.cr.execute(
+            SQL(
+                """
+                SELECT DISTINCT ON (property_id) property_id, id
+                  FROM estate_property_offer
+                 WHERE property_id IN %s
+              ORDER BY property_id, price DESC, id
+                """,
+                tuple(self.ids),
+            )
+        )
+        return {property_id: Offer.browse(offer_id) for property_id, offer_id in self.env.cr.fetchall()}
+
     def action_accept_highest_offer(self):
+        best_offers = self._get_best_offers()
         for record in self:
-            record.accept_highest_offer = True
             if record.state == "sold":
                 raise UserError(_("Property is already sold!"))
-
-            offers = record.offer_ids
-            if not offers:
+            if record.id not in best_offers:
                 raise UserError(_("There are no offers to accept!"))
-
-            best_offer = max(offers, key=lambda offer: offer.price)
-            if not best_offer.partner_id.email:
+            if not best_offers[record.id].partner_id.email:
                 raise UserError(_("The selected buyer does not have an email address."))
 
-            record.buyer_id = best_offer.partner_id
-            record.contact_email = best_offer.partner_id.email
-            best_offer.status = "accepted"
-            (offers - best_offer).write({"status": "refused"})
+        Offer = self.env["estate.property.offer"]
+        best_offer_ids = [offer.id for offer in best_offers.values()]
+        # refused first, so the single accepted offer index never sees two accepted offers of a property
+        Offer.search(
+            [("property_id", "in", self.ids), ("id", "not in", best_offer_ids), ("status", "!=", "refused")]
+        ).write({"status": "refused"})
+        Offer.flush_model(["status"])
+        Offer.browse(best_offer_ids).write({"status": "accepted"})
 
-            record.state = "sold"
-            record.sold_date = fields.Date.today()
+        self.write({"accept_highest_offer": True, "state": "sold", "sold_date": fields.Date.today()})
+        # one write per buyer rather than per property
+        for buyer, properties in self.grouped(lambda p: best_offers[p.id].partner_id).items():
+            properties.write({"buyer_id": buyer.id, "contact_email": buyer.email})
 
     def cancel_accept_highest_offer(self):
         for record in self:
@@ -265,43 +365,340 @@ class EstateProperty(models.Model):
 
         return True
 
-    @api.depends("offer_ids")
-    def _compute_offer_count(self):
-        for record in self:
-            record.offer_count = len(record.offer_ids)
+    # offer aggregates (best_price, offer_count, offer_price_total, average_offer_price) are maintained
+    # incrementally by estate.property.offer through _apply_offer_deltas, never by loading the offers
+
+    _OFFER_AGGREGATE_FIELDS = ["best_price", "offer_count", "offer_price_total", "average_offer_price"]
+
+    def init(self):
+        # fill the aggregates of properties created before they were maintained incrementally
+        self.env.cr.execute("SELECT id FROM estate_property WHERE offer_price_total IS NULL")
+        property_ids = [row[0] for row in self.env.cr.fetchall()]
+        if property_ids:
+            self.browse(property_ids)._recompute_offer_aggregates()
+
+        # properties sold through the Sold button before it set sold_date would be missing from the sales reports
+        self.env.cr.execute(
+            """
+            UPDATE estate_property
+               SET sold_date = COALESCE(write_date, create_date)::date
+             WHERE state = 'sold' AND sold_date IS NULL
+            """
+        )
+
+        # serves the top properties report
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS estate_property_company_expected_price_idx
+                ON estate_property (company_id, expected_price DESC)
+            """
+        )
+
+        self._create_trigram_indexes()
+
+        # bumped on every change of the properties, part of the cache key of the facet searches
+        self.env.cr.execute("CREATE SEQUENCE IF NOT EXISTS estate_property_facet_version_seq")
+
+    _TRIGRAM_SEARCH_FIELDS = ["name", "description", "postcode"]
+
+    def _create_trigram_indexes(self):
+        """Create the pg_trgm GIN indexes serving ILIKE '%term%' and similarity searches on the text fields."""
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except psycopg2.Error:
+            _logger.warning("Extension pg_trgm is not available, property text search will not be indexed.")
+            return
+        for fname in self._TRIGRAM_SEARCH_FIELDS:
+            self.env.cr.execute(
+                SQL(
+                    "CREATE INDEX IF NOT EXISTS %s ON estate_property USING gin (%s gin_trgm_ops)",
+                    SQL.identifier(f"estate_property_{fname}_trgm_idx"),
+                    SQL.identifier(fname),
+                )
+            )
+
+    @api.model
+    def _apply_offer_deltas(self, deltas):
+        """Apply offer deltas {property_id: (count, total, added_max, removed_max)} in one UPDATE.
+
+        Properties losing their best offer get a full recompute of their aggregates.
+        """
+        deltas = {property_id: delta for property_id, delta in deltas.items() if property_id}
+        if not deltas:
+            return
+        self.env["estate.property.offer"].flush_model(["property_id", "price"])
+        self.flush_model(self._OFFER_AGGREGATE_FIELDS)
+
+        values = SQL(", ").join(
+            SQL("(%s, %s, %s::float8, %s::float8, %s::float8)", property_id, *delta)
+            for property_id, delta in deltas.items()
+        )
+        self.env.cr.execute(
+            SQL(
+                """
+                UPDATE estate_property p
+                   SET offer_count = COALESCE(p.offer_count, 0) + d.count_delta,
+                       offer_price_total = COALESCE(p.offer_price_total, 0) + d.total_delta,
+                       average_offer_price = CASE WHEN COALESCE(p.offer_count, 0) + d.count_delta > 0
+                           THEN (COALESCE(p.offer_price_total, 0) + d.total_delta)
+                                / (COALESCE(p.offer_count, 0) + d.count_delta)
+                           ELSE 0 END,
+                       best_price = CASE WHEN d.removed_max >= COALESCE(p.best_price, 0) THEN NULL
+                           ELSE GREATEST(COALESCE(p.best_price, 0), d.added_max) END
+                  FROM (VALUES %s) AS d(id, count_delta, total_delta, added_max, removed_max)
+                 WHERE p.id = d.id
+             RETURNING p.id, p.best_price IS NULL
+                """,
+                values,
+            )
+        )
+        to_recompute = [property_id for property_id, lost_best in self.env.cr.fetchall() if lost_best]
+        self.browse(list(deltas)).invalidate_recordset(self._OFFER_AGGREGATE_FIELDS)
+        if to_recompute:
+            self.browse(to_recompute)._recompute_offer_aggregates()
+
+    def _get_offer_aggregates_query(self):
+        return SQL(
+            """
+            SELECT p.id,
+                   COUNT(o.id) AS offer_count,
+                   COALESCE(SUM(o.price), 0) AS offer_price_total,
+                   COALESCE(MAX(o.price), 0) AS best_price
+              FROM estate_property p
+         LEFT JOIN estate_property_offer o ON o.property_id = p.id
+             WHERE p.id IN %s
+          GROUP BY p.id
+            """,
+            tuple(self.ids),
+        )
+
+    def _recompute_offer_aggregates(self):
+        """Recompute the offer aggregates of these properties from scratch, in one UPDATE."""
+        if not self:
+            return
+        self.env["estate.property.offer"].flush_model(["property_id", "price"])
+        self.env.cr.execute(
+            SQL(
+                """
+                UPDATE estate_property p
+                   SET offer_count = agg.offer_count,
+                       offer_price_total = agg.offer_price_total,
+                       best_price = agg.best_price,
+                       average_offer_price = CASE WHEN agg.offer_count > 0
+                           THEN agg.offer_price_total / agg.offer_count ELSE 0 END
+                  FROM (%s) AS agg
+                 WHERE p.id = agg.id
+                """,
+                self._get_offer_aggregates_query(),
+            )
+        )
+        self.invalidate_recordset(self._OFFER_AGGREGATE_FIELDS)
+
+    @api.model
+    def check_offer_aggregates(self, repair=False):
+        """Compare the stored offer aggregates with a full recompute and return the inconsistent properties.
+
+        With ``repair=True`` the inconsistent properties are recomputed.
+        """
+        self.flush_model(self._OFFER_AGGREGATE_FIELDS)
+        self.env["estate.property.offer"].flush_model(["property_id", "price"])
+        self.env.cr.execute(
+            """
+            SELECT p.id
+              FROM estate_property p
+         LEFT JOIN (
+                   SELECT property_id,
+                          COUNT(*) AS offer_count,
+                          SUM(price) AS offer_price_total,
+                          MAX(price) AS best_price
+                     FROM estate_property_offer
+                 GROUP BY property_id
+                   ) agg ON agg.property_id = p.id
+             WHERE COALESCE(p.offer_count, 0) != COALESCE(agg.offer_count, 0)
+                OR ABS(COALESCE(p.offer_price_total, 0) - COALESCE(agg.offer_price_total, 0)) > 0.005
+                OR COALESCE(p.best_price, 0) != COALESCE(agg.best_price, 0)
+                OR ABS(COALESCE(p.average_offer_price, 0)
+                       - COALESCE(agg.offer_price_total / NULLIF(agg.offer_count, 0), 0)) > 0.005
+            """
+        )
+        inconsistent = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if inconsistent:
+            _logger.warning("Inconsistent offer aggregates on properties %s", inconsistent.ids)
+            if repair:
+                inconsistent._recompute_offer_aggregates()
+        return inconsistent
+
+    @api.model
+    def _reserve_unique_numbers(self, count):
+        """Reserve ``count`` reference numbers with a single call to the PostgreSQL sequence."""
+        if not count:
+            return []
+        sequence = (
+            self.env["ir.sequence"]
+            .sudo()
+            .search(
+                [("code", "=", "estate.property"), ("company_id", "in", [self.env.company.id, False])],
+                order="company_id",
+                limit=1,
+            )
+        )
+        if not sequence:
+            return [False] * count
+        if sequence.implementation != "standard" or sequence.use_date_range:
+            return [sequence.next_by_id() for _i in range(count)]
+
+        self.env.cr.execute(
+            SQL("SELECT nextval(%s) FROM generate_series(1, %s)", f"ir_sequence_{sequence.id:03d}", count)
+        )
+        return [sequence.get_next_char(number) for number in sorted(row[0] for row in self.env.cr.fetchall())]
 
     @api.model_create_multi
     def create(self, vals_list):
+        # the offer aggregates only ever come from the offers, never from the given values
         for vals in vals_list:
-            if not vals.get("unique_number"):
-                vals["unique_number"] = self.env["ir.sequence"].next_by_code("estate.property")
+            for fname in self._OFFER_AGGREGATE_FIELDS:
+                vals.pop(fname, None)
 
-        records = super().create(vals_list)
+        vals_without_number = [vals for vals in vals_list if not vals.get("unique_number")]
+        numbers = self._reserve_unique_numbers(len(vals_without_number))
+        for vals, number in zip(vals_without_number, numbers, strict=True):
+            vals["unique_number"] = number
 
-        for record in records:
-            offer_vals = {
-                "property_id": record.id,
-                "price": record.expected_price,
-                "status": "draft",
-                "partner_id": self.env.user.partner_id.id,
-            }
+        records = super().create(vals_list)
 
-            self.env["estate.property.offer"].create(offer_vals)
+        # imports can skip the seed offers with the context key or the system parameter
+        skip_seed_offers = self.env.context.get("estate_skip_seed_offers") or str2bool(
+            self.env["ir.config_parameter"].sudo().get_param("estate.skip_seed_offers", "False")
+        )
+        if not skip_seed_offers:
+            self.env["estate.property.offer"].create(
+                [
+                    {
+                        "property_id": record.id,
+                        "price": record.expected_price,
+                        "status": "draft",
+                        "partner_id": self.env.user.partner_id.id,
+                    }
+                    for record in records
+                ]
+            )
 
+        self._invalidate_facets()
         return records
 
+    def write(self, vals):
+        res = super().write(vals)
+        self._invalidate_facets()
+        return res
+
+    def unlink(self):
+        self._invalidate_facets()
+        return super().unlink()
+
+    # upper bounds of the price bands counted by search_facets
+    _PRICE_BANDS = [100000.0, 250000.0, 500000.0, 1000000.0]
+
+    @api.model
+    def search_facets(self, domain=None, offset=0, limit=80, order=None):
+        """Return one page of the properties matching ``domain`` with the counts of every facet bucket.
+
+        The result is ``{"ids": [...], "total": n, "facets": {...}}`` where the facets count the matching
+        properties per state, bedrooms, property type, tag and price band. It is computed with a fixed number
+        of queries and cached per domain and access scope until the next change of any property.
+        """
+        domain = list(domain or [])
+        self.env.cr.execute("SELECT last_value FROM estate_property_facet_version_seq")
+        version = self.env.cr.fetchone()[0]
+        # the version only moves when a change is committed; a transaction with uncommitted changes caches its
+        # results under a key of its own, never hit again once it commits or rolls back
+        version = (version, self.env.cr.postcommit.data.get("estate.property.facets"))
+        scope = (
+            self.env.uid,
+            self.env.su,
+            tuple(self.env.companies.ids),
+            self.env.context.get("active_test", True),
+        )
+        result = self._search_facets_cached(version, repr(domain), scope, domain, offset, limit, order)
+        return copy.deepcopy(result)
+
+    @ormcache("version", "domain_key", "scope", "offset", "limit", "order")
+    def _search_facets_cached(self, version, domain_key, scope, domain, offset, limit, order):
+        ids = self.search(domain, offset=offset, limit=limit, order=order).ids
+
+        facets = {"state": {}, "bedrooms": {}, "property_type_id": {}}
+        for state, bedrooms, property_type, count in self._read_group(
+            domain, groupby=["state", "bedrooms", "property_type_id"], aggregates=["__count"]
+        ):
+            for facet, value in (("state", state), ("bedrooms", bedrooms), ("property_type_id", property_type.id)):
+                facets[facet][value] = facets[facet].get(value, 0) + count
+        facets["tag_ids"] = {
+            tag.id: count for tag, count in self._read_group(domain, groupby=["tag_ids"], aggregates=["__count"]) if tag
+        }
+
+        self.flush_model(["expected_price"])
+        self.env.cr.execute(
+            SQL(
+                """
+                SELECT width_bucket(expected_price, %s::float8[]), COUNT(*)
+                  FROM estate_property
+                 WHERE id IN (%s)
+              GROUP BY 1
+                """,
+                self._PRICE_BANDS,
+                self._search(domain).subselect(),
+            )
+        )
+        band_counts = dict(self.env.cr.fetchall())
+        bounds = [0.0, *self._PRICE_BANDS, None]
+        facets["price_band"] = [
+            {"from": bounds[band], "to": bounds[band + 1], "count": band_counts.get(band, 0)}
+            for band in range(len(bounds) - 1)
+        ]
+
+        return {"ids": ids, "total": sum(facets["state"].values()), "facets": facets}
+
+    def _invalidate_facets(self):
+        """Retire the cached facet searches of all workers once the transaction is committed."""
+        cr = self.env.cr
+        # until it commits, the transaction caches its searches under its own id and the number of its changes
+        if "estate.property.facets" in cr.postcommit.data:
+            txid, changes = cr.postcommit.data["estate.property.facets"]
+        else:
+            cr.execute("SELECT txid_current()")
+            txid, changes = cr.fetchone()[0], 0
+        cr.postcommit.data["estate.property.facets"] = (txid, changes + 1)
+        if "estate.property.facets" not in cr.precommit.data:
+            cr.precommit.data["estate.property.facets"] = True
+
+            # bumped as late as possible, so that hardly any search can read the new version before the
+            # changes are visible to it
+            @cr.precommit.add
+            def bump_facet_version():
+                cr.execute("SELECT nextval('estate_property_facet_version_seq')")
+
     MAX_LIMIT = 5
 
+    @api.model
+    def _get_active_listing_counts(self, salesmen):
+        """Return {salesman: number of "new" listings} with one grouped query."""
+        groups = self._read_group(
+            [("salesman_id", "in", salesmen.ids), ("state", "=", "new")],
+            groupby=["salesman_id"],
+            aggregates=["__count"],
+        )
+        return dict(groups)
+
     @api.model_create_multi
     def create_limit(self, vals_list):
         records = super().create(vals_list)
 
-        for record in records:
-            if record.salesman_id:
-                active_count = self.search_count([("salesman_id", "=", record.salesman_id.id), ("state", "=", "new")])
-
+        active_counts = self._get_active_listing_counts(records.salesman_id)
+        for salesman in records.salesman_id:
+            active_count = active_counts.get(salesman, 0)
             if active_count > self.MAX_LIMIT:
-                record.message_post(
+                # one warning per salesman, on their last created listing
+                records.filtered(lambda r: r.salesman_id == salesman)[-1].message_post(
                     body=f"⚠️ Attention! The seller's active listing limit ({self.MAX_LIMIT}) has been exceeded. "
                     f"Currently active: {active_count}."
                 )
@@ -1,8 +1,10 @@
 import logging
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime, time, timedelta
 
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import SQL
 
 _logger = logging.getLogger(__name__)
 
@@ -36,7 +38,10 @@ class EstatePropertyOffer(models.Model):
 
     date_create = fields.Date(default=fields.Date.today())
 
-    has_activity = fields.Boolean(compute="_compute_has_activity")
+    date_price_escalated = fields.Date(string="Last Escalated", copy=False, readonly=True, index=True)
+    price_history_ids = fields.One2many("estate.property.offer.price.history", "offer_id", string="Price History")
+
+    has_activity = fields.Boolean(compute="_compute_has_activity", search="_search_has_activity")
 
     @api.depends("validity")
     def _compute_date_deadline(self):
@@ -68,9 +73,13 @@ class EstatePropertyOffer(models.Model):
         return res
 
     def action_accept(self):
+        # concurrent acceptances of the same listing queue up on the property row instead of racing
+        self.property_id._lock_for_offers()
         for offer in self:
             if offer.status != "accepted":
                 other_offers = offer.property_id.offer_ids - offer
+                if "accepted" in other_offers.mapped("status"):
+                    raise UserError(_("Another offer has already been accepted for %s.", offer.property_id.name))
                 other_offers.status = "refused"
                 offer.status = "accepted"
                 offer.property_id.write(
@@ -89,81 +98,272 @@ class EstatePropertyOffer(models.Model):
 
     _sql_constraints = [("check_price", "CHECK(price > 0)", "Offer price must be strictly positive.")]
 
+    def _get_highest_offer_prices(self, property_ids):
+        """Return {property_id: highest price} of the non-draft/non-refused offers, in one grouped query."""
+        if not property_ids:
+            return {}
+        groups = self._read_group(
+            [("property_id", "in", list(property_ids)), ("status", "not in", ["draft", "refused"])],
+            groupby=["property_id"],
+            aggregates=["price:max"],
+        )
+        return {property.id: max_price for property, max_price in groups}
+
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            property = self.env["estate.property"].browse(vals["property_id"])
+        # the highest price is read under the property lock so that concurrent bids are checked one after another
+        self.env["estate.property"].browse({vals["property_id"] for vals in vals_list})._lock_for_offers()
+        existing_prices = self._get_highest_offer_prices({vals["property_id"] for vals in vals_list})
+        highest_prices = dict(existing_prices)
+        self._check_unique_new_offers(vals_list)
 
-            for offer in property.offer_ids.filtered(lambda x: x.status not in ["draft", "refused"]):
-                if vals["price"] < offer.price:
-                    raise UserError(_("The offer must be higher than %.2f.", offer.price))
+        # offers that count toward the highest price also raise the bar for the following ones of the batch,
+        # draft and refused offers are only checked against the existing offers
+        for vals in vals_list:
+            price = vals.get("price", 0.0)
+            counts = vals.get("status", "draft") not in ("draft", "refused")
+            highest_price = (highest_prices if counts else existing_prices).get(vals["property_id"])
+            if highest_price is not None and price < highest_price:
+                raise UserError(_("The offer must be higher than %.2f.", highest_price))
+            if counts:
+                highest_prices[vals["property_id"]] = max(price, highest_price or 0.0)
 
         offers = super().create(vals_list)
+        self.env["estate.property"]._apply_offer_deltas(offers._collect_offer_deltas({}))
+        offers._schedule_offer_expiry()
 
-        for offer in offers:
-            if offer.property_id.state == "new" and offer.status == "received":
-                offer.property_id.state = "offer_received"
+        offers.filtered(lambda o: o.status == "received").property_id.filtered(lambda p: p.state == "new").write(
+            {"state": "offer_received"}
+        )
 
         return offers
 
-    @api.constrains("property_id", "partner_id", "status")
-    def _check_unique_offer(self):
+    def write(self, vals):
+        update_aggregates = "price" in vals or "property_id" in vals
+        if update_aggregates:
+            deltas = self._collect_offer_deltas({}, removed=True)
+        res = super().write(vals)
+        if update_aggregates:
+            self.env["estate.property"]._apply_offer_deltas(self._collect_offer_deltas(deltas))
+        if "validity" in vals or "date_deadline" in vals:
+            self._schedule_offer_expiry()
+        return res
+
+    def unlink(self):
+        deltas = self._collect_offer_deltas({}, removed=True)
+        res = super().unlink()
+        self.env["estate.property"]._apply_offer_deltas(deltas)
+        return res
+
+    def _collect_offer_deltas(self, deltas, removed=False):
+        """Add these offers to ``deltas`` as {property_id: (count, total, added_max, removed_max)}."""
         for offer in self:
-            check = self.search(
-                [
-                    ("property_id", "=", offer.property_id.id),
-                    ("partner_id", "=", offer.partner_id.id),
-                    ("status", "!=", "refused"),
-                    ("id", "!=", offer.id),
-                ]
+            count, total, added_max, removed_max = deltas.get(offer.property_id.id, (0, 0.0, None, None))
+            if removed:
+                removed_max = offer.price if removed_max is None else max(removed_max, offer.price)
+                deltas[offer.property_id.id] = (count - 1, total - offer.price, added_max, removed_max)
+            else:
+                added_max = offer.price if added_max is None else max(added_max, offer.price)
+                deltas[offer.property_id.id] = (count + 1, total + offer.price, added_max, removed_max)
+        return deltas
+
+    def init(self):
+        # lets PostgreSQL reject concurrent duplicates the Python checks cannot see yet
+        self.env.cr.execute(
+            """
+            SELECT property_id, partner_id, COUNT(*)
+              FROM estate_property_offer
+             WHERE status != 'refused'
+          GROUP BY property_id, partner_id
+            HAVING COUNT(*) > 1
+            """
+        )
+        duplicates = self.env.cr.fetchall()
+        if duplicates:
+            _logger.warning(
+                "Index estate_property_offer_unique_partner_idx not created, some buyers have several active offers "
+                "on a property (property_id, partner_id, count): %s",
+                duplicates,
+            )
+        else:
+            self.env.cr.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS estate_property_offer_unique_partner_idx
+                    ON estate_property_offer (property_id, partner_id)
+                 WHERE status != 'refused'
+                """
             )
+        # guarantees a single accepted offer per property, whatever the interleaving of the acceptances
+        self.env.cr.execute(
+            """
+            SELECT property_id
+              FROM estate_property_offer
+             WHERE status = 'accepted'
+          GROUP BY property_id
+            HAVING COUNT(*) > 1
+            """
+        )
+        property_ids = [row[0] for row in self.env.cr.fetchall()]
+        if property_ids:
+            _logger.warning(
+                "Index estate_property_offer_single_accepted_idx not created, some properties have several "
+                "accepted offers: %s",
+                property_ids,
+            )
+        else:
+            self.env.cr.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS estate_property_offer_single_accepted_idx
+                    ON estate_property_offer (property_id)
+                 WHERE status = 'accepted'
+                """
+            )
+        # serves the expiry cron and the "expiring soon" filters
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS estate_property_offer_open_deadline_idx
+                ON estate_property_offer (date_deadline)
+             WHERE status IN ('draft', 'received')
+            """
+        )
+
+    @api.model
+    def _check_unique_new_offers(self, vals_list):
+        """Check the offers to create against each other and the existing offers, before the unique index would
+        reject them with a database error."""
+        pairs = [
+            (vals["property_id"], vals.get("partner_id"))
+            for vals in vals_list
+            if vals.get("status", "draft") != "refused"
+        ]
+        if not pairs:
+            return
+        existing = self._read_group(
+            [
+                ("property_id", "in", [property_id for property_id, _partner_id in pairs]),
+                ("partner_id", "in", [partner_id for _property_id, partner_id in pairs]),
+                ("status", "!=", "refused"),
+            ],
+            groupby=["property_id", "partner_id"],
+        )
+        existing_pairs = {(property.id, partner.id) for property, partner in existing}
+        if len(set(pairs)) < len(pairs) or existing_pairs.intersection(pairs):
+            raise ValidationError(_("This buyer has already made an offer on this property."))
+
+    @api.constrains("property_id", "partner_id", "status")
+    def _check_unique_offer(self):
+        offers = self.filtered(lambda o: o.status != "refused")
+        if not offers:
+            return
+
+        duplicates = self._read_group(
+            [
+                ("property_id", "in", offers.property_id.ids),
+                ("partner_id", "in", offers.partner_id.ids),
+                ("status", "!=", "refused"),
+            ],
+            groupby=["property_id", "partner_id"],
+            having=[("__count", ">", 1)],
+        )
+        checked_pairs = {(offer.property_id, offer.partner_id) for offer in offers}
+        if any(pair in checked_pairs for pair in duplicates):
+            raise ValidationError(_("This buyer has already made an offer on this property."))
+
+    _CRON_BATCH_SIZE = 1000
 
-            if check:
-                raise ValidationError(_("This buyer has already made an offer on this property."))
+    @api.model
+    def _process_cron_batch(self, domain, process):
+        """Process the next batch of offers matching ``domain`` and report the progress to the running cron.
+
+        The cron runner commits after each call and calls the job again while offers remain, so a killed run
+        resumes from the last committed batch. ``process`` must take the offers out of ``domain``.
+        """
+        offers = self.search(domain, order="id", limit=self._CRON_BATCH_SIZE)
+        remaining = self.search_count(domain) - len(offers)
+        process(offers)
+
+        self.env["ir.cron"]._notify_progress(done=len(offers), remaining=remaining)
+        return offers
 
     @api.model
     def check_expired_offers(self):
-        check = datetime.now() - timedelta(days=30)
-        old_offers = self.search(
-            [("status", "not in", ["accepted", "refused", "expired"]), ("create_date", "<", check)]
+        today = fields.Date.today()
+        self._process_cron_batch(
+            [("status", "in", ["draft", "received"]), ("date_deadline", "<", today)],
+            lambda offers: offers.write({"status": "expired"}),
         )
-        old_offers.write({"status": "expired"})
+        next_offer = self.search(
+            [("status", "in", ["draft", "received"]), ("date_deadline", ">=", today)], order="date_deadline", limit=1
+        )
+        next_offer._schedule_offer_expiry()
         return True
 
+    def _schedule_offer_expiry(self):
+        """Trigger the expiry cron the day after the earliest deadline of these open offers."""
+        deadlines = [
+            offer.date_deadline for offer in self if offer.date_deadline and offer.status in ("draft", "received")
+        ]
+        cron = self.env.ref("estate.property_offer_cron", raise_if_not_found=False)
+        if not deadlines or not cron:
+            return
+
+        call_at = datetime.combine(min(deadlines) + timedelta(days=1), time.min)
+        triggers = self.env["ir.cron.trigger"].sudo()
+        if not triggers.search_count([("cron_id", "=", cron.id), ("call_at", "=", call_at)], limit=1):
+            cron.sudo()._trigger(at=call_at)
+
     @api.model
     def check_old_offers_more_seven_days(self):
         check = datetime.now() - timedelta(days=7)
-        old_offers = self.search([("status", "=", "draft"), ("create_date", "<", check)])
-
         activity_type = self.env.ref("mail.mail_activity_data_todo", raise_if_not_found=False)
         if not activity_type:
             _logger.warning("Activity type 'todo' not found! Skipping creation of activities.")
+            return
+        # offers leave the domain once they have their follow-up activity, so no cursor is needed
+        self._process_cron_batch(
+            [
+                ("status", "=", "draft"),
+                ("create_date", "<", check),
+                ("property_id.salesman_id", "!=", False),
+                ("activity_ids", "not any", [("activity_type_id", "=", activity_type.id)]),
+            ],
+            lambda offers: offers._schedule_follow_up_activities(activity_type),
+        )
 
-        for offer in old_offers:
-            user = offer.property_id.salesman_id
-            if not user:
-                _logger.info(f"Offer {offer.id} skipped: no assigned salesman.")
-                continue
-            if not activity_type:
-                _logger.info(f"Offer {offer.id} skipped: activity type not found.")
-                continue
-
-            offer.activity_schedule(
-                activity_type_id=activity_type.id,
-                user_id=user.id,
-                date_deadline=fields.Date.today(),
-                note=_("Follow up this offer for property %(name)s", name=offer.property_id.name),
-                summary=_("Follow up offers! %s"),
-            )
-            _logger.info(f"Activity created for offer {offer.id} assigned to user {user.name}.")
+    def _schedule_follow_up_activities(self, activity_type):
+        res_model_id = self.env["ir.model"]._get_id("estate.property.offer")
+        today = fields.Date.today()
+        activity_vals = [
+            {
+                "res_model_id": res_model_id,
+                "res_id": offer.id,
+                "activity_type_id": activity_type.id,
+                "user_id": offer.property_id.salesman_id.id,
+                "date_deadline": today,
+                "automated": True,
+                "summary": _("Follow up offer"),
+                "note": _("Follow up this offer for property %(name)s", name=offer.property_id.name),
+            }
+            for offer in self.sorted(lambda o: o.property_id.salesman_id.id)
+        ]
+        self.env["mail.activity"].create(activity_vals)
+        _logger.info(f"{len(activity_vals)} follow-up activities created for old offers.")
 
     def _compute_has_activity(self):
+        groups = self.env["mail.activity"]._read_group(
+            [("res_model", "=", "estate.property.offer"), ("res_id", "in", self.ids)],
+            groupby=["res_id"],
+        )
+        offer_ids = {res_id for (res_id,) in groups}
         for offer in self:
-            offer.has_activity = bool(
-                self.env["mail.activity"].search_count(
-                    [("res_model", "=", "estate.property.offer"), ("res_id", "=", offer.id)]
-                )
-            )
+            offer.has_activity = offer.id in offer_ids
+
+    def _search_has_activity(self, operator, value):
+        if operator not in ("=", "!="):
+            raise UserError(_("Operation not supported for pending activities: %s", operator))
+        if (operator == "=") == bool(value):
+            return [("activity_ids", "!=", False)]
+        return [("activity_ids", "=", False)]
 
     def action_view_activities(self):
         self.ensure_one()
@@ -178,16 +378,73 @@ class EstatePropertyOffer(models.Model):
 
     @api.model
     def update_price_old_offers(self):
-        date_inspection = fields.datetime.now() - timedelta(days=30)
-        old_offers = self.search(
+        # an offer is due 30 days after its creation, then 30 days after each escalation
+        date_inspection = fields.Date.today() - timedelta(days=30)
+        old_offers = self._process_cron_batch(
             [
-                ("date_create", "<", date_inspection),
                 ("status", "not in", ["accepted", "refused", "expired"]),
-            ]
+                "|",
+                "&",
+                ("date_price_escalated", "=", False),
+                ("date_create", "<", date_inspection),
+                ("date_price_escalated", "<", date_inspection),
+            ],
+            self._increase_old_offers_price,
         )
-        for offer in old_offers:
-            old_price = offer.price
-            new_price = offer.price * 1.1
-            offer.write({"price": new_price})
-            offer.message_post(body=f"The price of the offer has been updated from {old_price} to {new_price}.")
         return len(old_offers)
+
+    _PRICE_ESCALATION_RATE = 1.1
+
+    @api.model
+    def _increase_old_offers_price(self, old_offers):
+        """Raise the price of ``old_offers`` in one UPDATE, keeping the old/new prices in the price history."""
+        if not old_offers:
+            return
+        today = fields.Date.today()
+        old_prices = {offer.id: offer.price for offer in old_offers}
+        deltas = old_offers._collect_offer_deltas({}, removed=True)
+
+        old_offers.flush_recordset(["price", "date_price_escalated"])
+        self.env.cr.execute(
+            SQL(
+                """
+                UPDATE estate_property_offer
+                   SET price = price * %s,
+                       date_price_escalated = %s,
+                       write_uid = %s,
+                       write_date = NOW() AT TIME ZONE 'UTC'
+                 WHERE id IN %s
+                """,
+                self._PRICE_ESCALATION_RATE,
+                today,
+                self.env.uid,
+                tuple(old_offers.ids),
+            )
+        )
+        old_offers.invalidate_recordset(["price", "date_price_escalated", "write_uid", "write_date"])
+        self.env["estate.property"]._apply_offer_deltas(old_offers._collect_offer_deltas(deltas))
+
+        self.env["estate.property.offer.price.history"].create(
+            [
+                {
+                    "offer_id": offer.id,
+                    "property_id": offer.property_id.id,
+                    "date": today,
+                    "old_price": old_prices[offer.id],
+                    "new_price": offer.price,
+                }
+                for offer in old_offers
+            ]
+        )
+
+        offer_counts = Counter(offer.property_id.id for offer in old_offers)
+        old_offers.property_id._message_log_batch(
+            bodies={
+                property_id: _(
+                    "The price of %(count)s old offer(s) has been increased by %(rate)s%%.",
+                    count=count,
+                    rate=round((self._PRICE_ESCALATION_RATE - 1) * 100),
+                )
+                for property_id, count in offer_counts.items()
+            }
+        )
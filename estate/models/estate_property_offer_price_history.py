@@ -0,0 +1,13 @@
+from odoo import fields, models
+
+
+class EstatePropertyOfferPriceHistory(models.Model):
+    _name = "estate.property.offer.price.history"
+    _description = "Property Offer Price History"
+    _order = "date desc, id desc"
+
+    offer_id = fields.Many2one("estate.property.offer", required=True, ondelete="cascade", index=True)
+    property_id = fields.Many2one("estate.property", required=True, ondelete="cascade", index=True)
+    date = fields.Date(required=True, default=fields.Date.context_today)
+    old_price = fields.Float()
+    new_price = fields.Float()
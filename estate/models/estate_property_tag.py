@@ -12,3 +12,13 @@ class EstatePropertyTag(models.Model):
     _sql_constraints = [
         ("unique_name", "UNIQUE (name)", "The name of the module must be unique!"),
     ]
+
+    def write(self, vals):
+        res = super().write(vals)
+        # the facet searches count the properties per tag
+        self.env["estate.property"]._invalidate_facets()
+        return res
+
+    def unlink(self):
+        self.env["estate.property"]._invalidate_facets()
+        return super().unlink()
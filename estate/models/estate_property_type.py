@@ -13,13 +13,55 @@ class EstatePropertyType(models.Model):
 
     offer_ids = fields.One2many(comodel_name="estate.property.offer", inverse_name="property_type_id", string="Offers")
 
-    offer_count = fields.Integer(compute="_compute_offer_count")
+    offer_count = fields.Integer(compute="_compute_offer_stats")
+    offer_avg_price = fields.Float(string="Average Offer", compute="_compute_offer_stats")
+    offer_max_price = fields.Float(string="Highest Offer", compute="_compute_offer_stats")
 
-    @api.depends("offer_ids")
-    def _compute_offer_count(self):
+    property_new_count = fields.Integer(string="New", compute="_compute_property_state_counts")
+    property_offer_received_count = fields.Integer(string="Offer Received", compute="_compute_property_state_counts")
+    property_offer_accepted_count = fields.Integer(string="Offer Accepted", compute="_compute_property_state_counts")
+    property_sold_count = fields.Integer(string="Sold", compute="_compute_property_state_counts")
+    property_cancelled_count = fields.Integer(string="Cancelled", compute="_compute_property_state_counts")
+
+    @api.depends("offer_ids.price")
+    def _compute_offer_stats(self):
+        groups = self.env["estate.property.offer"]._read_group(
+            [("property_type_id", "in", self._origin.ids)],
+            groupby=["property_type_id"],
+            aggregates=["__count", "price:avg", "price:max"],
+        )
+        stats = {property_type.id: values for property_type, *values in groups}
+        for record in self:
+            record.offer_count, record.offer_avg_price, record.offer_max_price = stats.get(
+                record._origin.id, (0, 0.0, 0.0)
+            )
+
+    @api.depends("property_ids.state")
+    def _compute_property_state_counts(self):
+        groups = self.env["estate.property"]._read_group(
+            [("property_type_id", "in", self._origin.ids)],
+            groupby=["property_type_id", "state"],
+            aggregates=["__count"],
+        )
+        counts = {(property_type.id, state): count for property_type, state, count in groups}
         for record in self:
-            record.offer_count = len(record.offer_ids)
+            type_id = record._origin.id
+            record.property_new_count = counts.get((type_id, "new"), 0)
+            record.property_offer_received_count = counts.get((type_id, "offer_received"), 0)
+            record.property_offer_accepted_count = counts.get((type_id, "offer_accepted"), 0)
+            record.property_sold_count = counts.get((type_id, "sold"), 0)
+            record.property_cancelled_count = counts.get((type_id, "cancelled"), 0)
 
     _sql_constraints = [
         ("unique_name", "UNIQUE (name)", "The name of the module must be unique!"),
     ]
+
+    def write(self, vals):
+        res = super().write(vals)
+        # the facet searches count the properties per property type
+        self.env["estate.property"]._invalidate_facets()
+        return res
+
+    def unlink(self):
+        self.env["estate.property"]._invalidate_facets()
+        return super().unlink()
@@ -1,4 +1,4 @@
-from odoo import fields, models
+from odoo import api, fields, models
 
 
 class ResUsers(models.Model):
@@ -7,3 +7,11 @@ class ResUsers(models.Model):
     property_ids = fields.One2many(
         comodel_name="estate.property", inverse_name="salesman_id", string="Properties", domain=[("state", "=", "new")]
     )
+
+    active_property_count = fields.Integer(string="Active Listings", compute="_compute_active_property_count")
+
+    @api.depends("property_ids")
+    def _compute_active_property_count(self):
+        active_counts = self.env["estate.property"]._get_active_listing_counts(self._origin)
+        for user in self:
+            user.active_property_count = active_counts.get(user._origin, 0)
@@ -1 +1,4 @@
 from . import top_property_report
+from . import estate_property_sale_analysis
+from . import property_offer_report
+from . import ir_actions_report
@@ -0,0 +1,46 @@
+from odoo import fields, models, tools
+from odoo.tools import SQL
+
+
+class EstatePropertySaleAnalysis(models.Model):
+    _name = "estate.property.sale.analysis"
+    _description = "Property Sales Analysis"
+    _auto = False
+    _order = "sold_date desc, id desc"
+    _rec_name = "property_id"
+
+    property_id = fields.Many2one("estate.property", string="Property", readonly=True)
+    sold_date = fields.Date(readonly=True)
+    salesman_id = fields.Many2one("res.users", string="Salesman", readonly=True)
+    buyer_id = fields.Many2one("res.partner", string="Buyer", readonly=True)
+    property_type_id = fields.Many2one("estate.property.type", string="Property Type", readonly=True)
+    company_id = fields.Many2one("res.company", string="Company", readonly=True)
+    selling_price = fields.Float(readonly=True, aggregator="sum")
+    total_area = fields.Float(readonly=True, aggregator="sum")
+    price_per_sqm = fields.Float(readonly=True, aggregator="avg")
+
+    def _query(self):
+        return SQL(
+            """
+            SELECT p.id,
+                   p.id AS property_id,
+                   p.sold_date,
+                   p.salesman_id,
+                   p.buyer_id,
+                   p.property_type_id,
+                   p.company_id,
+                   p.selling_price,
+                   COALESCE(p.living_area, 0) + COALESCE(p.garden_area, 0) AS total_area,
+                   CASE WHEN COALESCE(p.living_area, 0) + COALESCE(p.garden_area, 0) > 0
+                        THEN p.selling_price / (COALESCE(p.living_area, 0) + COALESCE(p.garden_area, 0))
+                        ELSE 0 END AS price_per_sqm
+              FROM estate_property p
+             WHERE p.state = 'sold'
+               AND p.sold_date IS NOT NULL
+               AND p.active
+            """
+        )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(SQL("CREATE OR REPLACE VIEW %s AS (%s)", SQL.identifier(self._table), self._query()))
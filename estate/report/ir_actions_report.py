@@ -0,0 +1,41 @@
+import logging
+
+from odoo import models
+from odoo.tools import split_every
+from odoo.tools.pdf import merge_pdf
+
+_logger = logging.getLogger(__name__)
+
+
+class IrActionsReport(models.Model):
+    _inherit = "ir.actions.report"
+
+    _OFFER_REPORT_CHUNK_SIZE = 100
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        report_name = self._get_report(report_ref).report_name
+
+        if report_name == "estate.report_property_top":
+            pdf_content = self.env["report.estate.report_property_top"]._get_cached_pdf(
+                lambda: super(IrActionsReport, self)._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)[0]
+            )
+            return pdf_content, "pdf"
+
+        if report_name == "estate.report_property_offers" and res_ids and len(res_ids) > self._OFFER_REPORT_CHUNK_SIZE:
+            return self._render_offer_report_chunks(report_ref, res_ids, data), "pdf"
+
+        return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+    def _render_offer_report_chunks(self, report_ref, res_ids, data):
+        """Render large selections in chunks, each in its own wkhtmltopdf run, and merge the PDFs.
+
+        The chunks are rendered one after another on the current cursor, so they see the same data as the caller
+        and the print costs no extra database connection; only one chunk of records is kept in the cache.
+        """
+        chunks = list(split_every(self._OFFER_REPORT_CHUNK_SIZE, res_ids, list))
+        _logger.info("Rendering the property offers report of %s properties in %s chunks", len(res_ids), len(chunks))
+        pdfs = []
+        for chunk in chunks:
+            pdfs.append(super()._render_qweb_pdf(report_ref, res_ids=chunk, data=data)[0])
+            self.env.invalidate_all()
+        return merge_pdf(pdfs)
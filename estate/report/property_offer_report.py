@@ -0,0 +1,19 @@
+from odoo import api, models
+
+
+class ReportPropertyOffers(models.AbstractModel):
+    _name = "report.estate.report_property_offers"
+    _description = "Property Offers Report"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env["estate.property"].browse(docids)
+        # load the offers, buyers and salesmen of the whole selection at once, not row by row in the template
+        docs.offer_ids.partner_id.mapped("name")
+        docs.salesman_id.mapped("name")
+        return {
+            "doc_ids": docids,
+            "doc_model": "estate.property",
+            "docs": docs,
+            "status_labels": dict(self.env["estate.property.offer"]._fields["status"]._description_selection(self.env)),
+        }
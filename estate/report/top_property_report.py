@@ -1,3 +1,5 @@
+import json
+
 from odoo import api, models
 
 
@@ -5,11 +7,78 @@ class ReportPropertyTop(models.AbstractModel):
     _name = "report.estate.report_property_top"
     _description = "Top 10 Properties by Price"
 
+    _TOP_LIMIT = 10
+    _CACHE_PREFIX = "estate_top_properties_"
+
+    def init(self):
+        # templates and layouts may have changed with the upgrade
+        self.env["ir.attachment"].sudo().search([("res_model", "=", self._name)]).unlink()
+
+    @api.model
+    def _get_top_properties(self):
+        return self.env["estate.property"].search([], order="expected_price desc", limit=self._TOP_LIMIT)
+
     @api.model
     def _get_report_values(self, docids, data=None):
-        docs = self.env["estate.property"].search([], order="expected_price desc", limit=10)
+        docs = self._get_top_properties()
         return {
             "doc_ids": docs.ids,
             "doc_model": "estate.property",
             "docs": docs,
         }
+
+    @api.model
+    def _get_cache_key(self):
+        # the top 10 depends on the companies and record rules of the user, and the PDF on their language
+        scope = "all" if self.env.user.has_group("estate.estate_group_manager") else f"user{self.env.uid}"
+        companies = "-".join(str(company_id) for company_id in sorted(self.env.companies.ids))
+        return f"{self._CACHE_PREFIX}{companies}_{scope}_{self.env.lang}"
+
+    @api.model
+    def _get_fingerprint(self, docs):
+        """Return what the PDF of ``docs`` looks like besides the properties themselves: the last change of the
+        properties, of their salesmen, of the companies and their logos, and of the report templates and layouts.
+        """
+        companies = self.env.companies.sudo()
+        records = [
+            docs.sudo(),
+            docs.sudo().salesman_id,
+            docs.sudo().salesman_id.partner_id,
+            companies,
+            companies.partner_id,
+        ]
+        write_dates = [record.write_date for recordset in records for record in recordset if record.write_date]
+        self.env["ir.ui.view"].flush_model(["write_date"])
+        self.env.cr.execute("SELECT MAX(write_date) FROM ir_ui_view WHERE type = 'qweb'")
+        write_dates.append(self.env.cr.fetchone()[0])
+        return json.dumps([docs.ids, str(max(filter(None, write_dates), default=""))])
+
+    @api.model
+    def _get_cached_pdf(self, render):
+        """Return the cached PDF of the current access scope, rendering and storing it with ``render`` if needed.
+
+        An entry is only served while its fingerprint matches the current top properties, so an entry stored by a
+        render that ran alongside a change is never served.
+        """
+        attachments = self.env["ir.attachment"].sudo()
+        key = self._get_cache_key()
+        docs = self._get_top_properties()
+        fingerprint = self._get_fingerprint(docs)
+
+        cached = attachments.search([("res_model", "=", self._name), ("name", "=", key)])
+        valid = cached.filtered(lambda entry: entry.description == fingerprint)
+        if valid:
+            return valid[0].raw
+        cached.unlink()
+
+        pdf_content = render()
+        attachments.create(
+            {
+                "name": key,
+                "res_model": self._name,
+                "raw": pdf_content,
+                "mimetype": "application/pdf",
+                "description": fingerprint,
+            }
+        )
+        return pdf_content
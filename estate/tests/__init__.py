@@ -1,3 +1,5 @@
 from . import test_estate_property
 from . import test_estate_property_offer
 from . import test_estate_property_type
+from . import test_estate_sold_report
+from . import test_estate_benchmark
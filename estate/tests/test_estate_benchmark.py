@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2.errors
+
+from odoo import SUPERUSER_ID, api
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install", "-standard", "estate_benchmark")
+class EstateBenchmarkTestCase(TransactionCase):
+    """Бенчмарки на больших объемах данных, запускаются отдельно: --test-tags estate_benchmark"""
+
+    SIZES = (1, 100, 1000)
+    BIDDERS = 50
+    SEARCH_ROWS = 500000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.partners = cls.env["res.partner"].create([{"name": f"Benchmark Buyer {i}"} for i in range(3)])
+
+    def _create_properties(self, count):
+        properties = self.env["estate.property"].create(
+            [{"name": f"Benchmark House {i}", "expected_price": 100000 + i, "living_area": 50} for i in range(count)]
+        )
+        self.env["estate.property.offer"].create(
+            [
+                {"price": 90000 + i, "partner_id": partner.id, "property_id": property.id}
+                for property in properties
+                for i, partner in enumerate(self.partners)
+            ]
+        )
+        self.env.flush_all()
+        self.env.invalidate_all()
+        return properties
+
+    def _measure(self, func):
+        start_queries = self.cr.sql_log_count
+        start_time = time.perf_counter()
+        func()
+        return self.cr.sql_log_count - start_queries, time.perf_counter() - start_time
+
+    def test_offer_report_rendering(self):
+        """Бенчмарк: отчет по офферам для 1/100/1000 объектов недвижимости"""
+        queries_by_size = {}
+        for size in self.SIZES:
+            properties = self._create_properties(size)
+            queries, duration = self._measure(
+                lambda properties=properties: self.env["ir.actions.report"]._render_qweb_html(
+                    "estate.report_property_offers", properties.ids
+                )
+            )
+            _logger.info("Offer report for %s properties: %s queries, %.3fs", size, queries, duration)
+            queries_by_size[size] = queries
+
+        self.assertEqual(
+            queries_by_size[100], queries_by_size[1000], "The offer report must not cost queries per property"
+        )
+
+    def _run_concurrently(self, property_id, jobs):
+        """Run each job through the auction lock of the property; return the outcome of every job."""
+        Property = self.env["estate.property"]
+
+        def run(job):
+            try:
+                Property._run_in_auction(property_id, job)
+            except UserError:
+                return "rejected"
+            except psycopg2.errors.SerializationFailure:
+                return "conflict"
+            return "done"
+
+        # each waiting job holds one connection, the running one two: stay well below db_maxconn
+        with ThreadPoolExecutor(max_workers=min(len(jobs), 25)) as executor:
+            return list(executor.map(run, jobs))
+
+    def _drop_hot_listing(self, property_id, partner_ids):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            hot_listing = env["estate.property"].browse(property_id)
+            hot_listing.offer_ids.unlink()
+            hot_listing.state = "cancelled"
+            hot_listing.unlink()
+            env["res.partner"].browse(partner_ids).unlink()
+
+    def test_concurrent_bids_and_acceptance(self):
+        """Стресс-тест: 50 параллельных покупателей делают ставки и принимают офферы на один объект"""
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            property_id = (
+                env["estate.property"]
+                .with_context(estate_skip_seed_offers=True)
+                .create({"name": "Hot Listing", "expected_price": 1000})
+                .id
+            )
+            partner_ids = (
+                env["res.partner"]
+                .create([{"name": f"Bidder {i}", "email": f"bidder{i}@test.com"} for i in range(self.BIDDERS)])
+                .ids
+            )
+        self.addCleanup(self._drop_hot_listing, property_id, partner_ids)
+
+        def bid(i):
+            return lambda env: env["estate.property.offer"].create(
+                {"price": 1000 + i, "partner_id": partner_ids[i], "property_id": property_id, "status": "received"}
+            )
+
+        bid_outcomes = self._run_concurrently(property_id, [bid(i) for i in range(self.BIDDERS)])
+        _logger.info("Concurrent bids: %s", {outcome: bid_outcomes.count(outcome) for outcome in set(bid_outcomes)})
+
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            bids = env["estate.property.offer"].search([("property_id", "=", property_id)], order="id")
+            # the bids were checked one after another, so every accepted bid beats the previous ones
+            self.assertEqual(bids.mapped("price"), sorted(bids.mapped("price")))
+            self.assertEqual(len(bids), bid_outcomes.count("done"))
+            self.assertEqual(bid_outcomes.count("conflict"), 0, "Bids must not need retries")
+            offer_ids = bids.ids
+
+        def accept(offer_id):
+            return lambda env: env["estate.property.offer"].browse(offer_id).action_accept()
+
+        accept_outcomes = self._run_concurrently(property_id, [accept(offer_id) for offer_id in offer_ids])
+        _logger.info(
+            "Concurrent acceptances: %s", {outcome: accept_outcomes.count(outcome) for outcome in set(accept_outcomes)}
+        )
+
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            accepted = env["estate.property.offer"].search(
+                [("property_id", "=", property_id), ("status", "=", "accepted")]
+            )
+            self.assertEqual(len(accepted), 1)
+            self.assertEqual(accept_outcomes.count("done"), 1)
+            self.assertEqual(accept_outcomes.count("conflict"), 0, "Acceptances must not need retries")
+            self.assertEqual(env["estate.property"].browse(property_id).buyer_id, accepted.partner_id)
+
+    def test_trigram_search(self):
+        """Бенчмарк: поиск по подстроке среди 500 тыс. объектов с триграммными индексами и без них"""
+        if not self.env.registry.has_trigram:
+            self.skipTest("pg_trgm is not installed")
+
+        self.env.cr.execute(
+            SQL(
+                """
+                INSERT INTO estate_property (name, description, postcode, expected_price, state, company_id, active)
+                     SELECT 'Generated House ' || md5(i::text), 'Generated description ' || md5((i * 7)::text),
+                            lpad((i %% 100000)::text, 5, '0'), 100000 + i, 'new', %s, true
+                       FROM generate_series(1, %s) AS i
+                """,
+                self.env.company.id,
+                self.SEARCH_ROWS,
+            )
+        )
+        self.env.cr.execute("ANALYZE estate_property")
+        term = hashlib.md5(b"4242").hexdigest()[3:11]
+
+        def search():
+            self.env["estate.property"].search([("name", "ilike", term)])
+            self.env.invalidate_all()
+
+        _queries, indexed = self._measure(search)
+        self.env.cr.execute("DROP INDEX estate_property_name_trgm_idx")
+        _queries, unindexed = self._measure(search)
+        _logger.info(
+            "ILIKE search in %s properties: %.3fs indexed, %.3fs unindexed", self.SEARCH_ROWS, indexed, unindexed
+        )
+
+        self.assertLess(indexed, unindexed)
+        self.assertIn(term, self.env["estate.property"].search_similar(term, limit=1).name)
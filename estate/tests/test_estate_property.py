@@ -1,6 +1,14 @@
+import io
+from unittest.mock import patch
+
+from odoo import SUPERUSER_ID, api, fields
 from odoo.exceptions import UserError, ValidationError
 from odoo.tests import Form, tagged
 from odoo.tests.common import TransactionCase
+from odoo.tools import SQL, file_open
+from odoo.tools.pdf import PdfFileReader
+
+from odoo.addons.base.models.ir_actions_report import IrActionsReport
 
 
 @tagged("post_install", "-at_install")
@@ -196,3 +204,422 @@ class EstatePropertyTestCase(TransactionCase):
             str(error_context.exception),
             "The selling price should not be allowed to fall below 90% of the expected price.",
         )
+
+    def test_08_offer_aggregates(self):
+        """Тест: агрегаты офферов обновляются при создании, изменении и удалении офферов"""
+        villa = self.properties[1]
+        seed_offer = villa.offer_ids.filtered(lambda o: o.status == "draft")
+
+        # стартовый оффер (500000) и тестовый оффер (450000)
+        self.assertRecordValues(villa, [{"best_price": 500000, "offer_count": 2, "average_offer_price": 475000}])
+
+        self.test_offer.price = 460000
+        self.assertRecordValues(villa, [{"best_price": 500000, "offer_count": 2, "average_offer_price": 480000}])
+
+        # удаление лучшего оффера требует полного пересчета
+        seed_offer.unlink()
+        self.assertRecordValues(villa, [{"best_price": 460000, "offer_count": 1, "average_offer_price": 460000}])
+
+        self.assertFalse(self.env["estate.property"].check_offer_aggregates() & self.properties)
+
+    def test_09_sale_analysis(self):
+        """Тест: проданная недвижимость попадает в анализ продаж по дате продажи"""
+        property_to_sell = self.properties[0]
+        property_to_sell.estate_property_action_sold()
+        self.env.flush_all()
+
+        sale = self.env["estate.property.sale.analysis"].search([("property_id", "=", property_to_sell.id)])
+        self.assertRecordValues(
+            sale,
+            [{"sold_date": fields.Date.today(), "total_area": 150, "price_per_sqm": 0}],
+        )
+
+    def test_10_top_report_cache_invalidation(self):
+        """Тест: кэш отчета о топ-недвижимости перестраивается только при изменении, влияющем на топ-10"""
+        report = self.env["report.estate.report_property_top"]
+        renders = []
+
+        def render():
+            renders.append(True)
+            return b"%PDF-1.4"
+
+        Property = self.env["estate.property"].with_context(estate_skip_seed_offers=True)
+        Property.create([{"name": f"Top House {i}", "expected_price": 900000 + i} for i in range(10)])
+        cheap = Property.create({"name": "Cheap House", "expected_price": 1000})
+        report._get_cached_pdf(render)
+
+        # недвижимость вне топа - кэш остается
+        cheap.expected_price = 2000
+        report._get_cached_pdf(render)
+        self.assertEqual(len(renders), 1)
+
+        cheap.expected_price = 2000000
+        report._get_cached_pdf(render)
+        self.assertEqual(len(renders), 2)
+
+    def _count_create_queries(self, count):
+        """Считаем количество SQL-запросов при создании пакета недвижимости"""
+        # номера передаются явно, чтобы измерять только создание офферов
+        vals_list = [
+            {"name": f"Bulk House {i}", "expected_price": 100000 + i, "living_area": 50, "unique_number": f"B{i}"}
+            for i in range(count)
+        ]
+        self.env.flush_all()
+        start = self.cr.sql_log_count
+        properties = self.env["estate.property"].create(vals_list)
+        self.env.flush_all()
+        self.assertEqual(len(properties.offer_ids), count, "Each property must get its seed offer")
+        return self.cr.sql_log_count - start
+
+    def test_11_create_seed_offers_in_batch(self):
+        """Тест: стартовые офферы создаются одним пакетом"""
+        small_batch = self._count_create_queries(5)
+        big_batch = self._count_create_queries(20)
+
+        self.assertEqual(small_batch, big_batch, "The number of queries must not depend on the number of properties")
+
+    def test_12_create_without_seed_offers(self):
+        """Тест: при импорте стартовые офферы можно не создавать"""
+        new_property = (
+            self.env["estate.property"]
+            .with_context(estate_skip_seed_offers=True)
+            .create({"name": "Imported House", "expected_price": 100000, "living_area": 50})
+        )
+
+        self.assertFalse(new_property.offer_ids)
+
+    def test_13_reserve_unique_numbers_in_one_call(self):
+        """Тест: блок номеров резервируется одним запросом независимо от размера"""
+        Property = self.env["estate.property"]
+        Property._reserve_unique_numbers(1)  # последовательность уже в кэше
+
+        start = self.cr.sql_log_count
+        Property._reserve_unique_numbers(5)
+        small_batch = self.cr.sql_log_count - start
+
+        start = self.cr.sql_log_count
+        numbers = Property._reserve_unique_numbers(500)
+        big_batch = self.cr.sql_log_count - start
+
+        self.assertEqual(small_batch, big_batch)
+        self.assertEqual(len(set(numbers)), 500)
+        self.assertTrue(all(number.startswith("PROP") for number in numbers))
+
+    def test_14_reserve_unique_numbers_concurrently(self):
+        """Тест: резервирование номеров не блокирует параллельные транзакции"""
+        with self.registry.cursor() as holder_cr:
+            holder_env = api.Environment(holder_cr, SUPERUSER_ID, {})
+            holder_numbers = holder_env["estate.property"]._reserve_unique_numbers(50)
+
+            # транзакция держателя открыта: блокировка строки ir_sequence (как у next_by_code
+            # с реализацией no_gap) заставила бы вторую транзакцию ждать и упасть по lock_timeout
+            holder_cr.execute(
+                """
+                SELECT COUNT(*)
+                  FROM pg_locks l
+                  JOIN pg_class c ON c.oid = l.relation
+                 WHERE l.pid = pg_backend_pid()
+                   AND c.relname = 'ir_sequence'
+                   AND l.mode != 'AccessShareLock'
+                """
+            )
+            self.assertEqual(holder_cr.fetchone()[0], 0, "The reservation must not lock the sequence row")
+
+            with self.registry.cursor() as cr:
+                cr.execute("SET LOCAL lock_timeout = '1s'")
+                numbers = api.Environment(cr, SUPERUSER_ID, {})["estate.property"]._reserve_unique_numbers(50)
+
+            holder_cr.rollback()
+
+        self.assertEqual(len(set(holder_numbers + numbers)), 100, "Concurrent reservations must not return duplicates")
+
+    def test_15_create_limit_warns_once_per_salesman(self):
+        """Тест: предупреждение о лимите объявлений публикуется один раз на продавца"""
+        Property = self.env["estate.property"]
+        salesman = self.env["res.users"].create({"name": "Busy Salesman", "login": "busy_salesman"})
+
+        records = Property.create_limit(
+            [
+                {"name": f"Listing {i}", "expected_price": 100000, "living_area": 50, "salesman_id": salesman.id}
+                for i in range(Property.MAX_LIMIT + 2)
+            ]
+        )
+
+        warnings = self.env["mail.message"].search(
+            [("model", "=", "estate.property"), ("res_id", "in", records.ids), ("body", "ilike", "listing limit")]
+        )
+        self.assertEqual(len(warnings), 1)
+        self.assertEqual(salesman.active_property_count, Property.MAX_LIMIT + 2)
+
+    def test_16_action_sold_in_bulk(self):
+        """Тест: массовая продажа оставляет в чаттере сообщение и активность для каждой недвижимости"""
+        properties = self.properties[:2]
+
+        properties.estate_property_action_sold()
+
+        for record in properties:
+            self.assertEqual(record.state, "sold")
+            self.assertEqual(record.sold_date, fields.Date.today())
+            self.assertIn("has been successfully sold", str(record.message_ids.mapped("body")))
+            self.assertEqual(len(record.activity_ids), 1)
+            self.assertEqual(record.activity_ids.user_id, record.salesman_id)
+
+    def test_17_mass_update_in_background(self):
+        """Тест: массовое обновление выше порога выполняется кроном пакетами"""
+        self.env["ir.config_parameter"].sudo().set_param("estate.mass_update_background_threshold", 1)
+        Wizard = self.env["estate.property.mass.update.wizard"]
+        wizard = Wizard.with_context(active_ids=self.properties[:2].ids).create(
+            {"state": "cancelled", "fold_tracking": True}
+        )
+        self.assertEqual(wizard.property_count, 2)
+
+        wizard.action_apply()
+        self.assertEqual(wizard.job_state, "pending")
+        self.assertNotIn("cancelled", self.properties[:2].mapped("state"))
+
+        self.patch(type(Wizard), "_BATCH_SIZE", 1)
+        Wizard._cron_process_mass_updates()
+        self.assertEqual(wizard.processed_count, 1)
+        Wizard._cron_process_mass_updates()
+        self.assertEqual(wizard.job_state, "done")
+        self.assertEqual(set(self.properties[:2].mapped("state")), {"cancelled"})
+        for record in self.properties[:2]:
+            self.assertIn("Status set to Cancelled by a mass update.", str(record.message_ids.mapped("body")))
+
+    def test_28_mass_update_without_selection(self):
+        """Тест: мастер без выбранных записей ничего не обновляет"""
+        wizard = self.env["estate.property.mass.update.wizard"].create({"state": "cancelled"})
+
+        self.assertEqual(wizard.property_count, 0)
+        wizard.action_apply()
+        self.assertNotIn("cancelled", self.properties.mapped("state"))
+
+    def test_29_search_facets_after_tag_and_type_unlink(self):
+        """Тест: удаление тега или типа сбрасывает закэшированные счетчики фасетов"""
+        Property = self.env["estate.property"].with_context(estate_skip_seed_offers=True)
+        tag = self.env["estate.property.tag"].create({"name": "Removed Facet Tag"})
+        property_type = self.env["estate.property.type"].create({"name": "Removed Facet Type"})
+        Property.create(
+            {
+                "name": "Tagged Facet House",
+                "expected_price": 1000,
+                "tag_ids": [(4, tag.id)],
+                "property_type_id": property_type.id,
+            }
+        )
+        domain = [("name", "=", "Tagged Facet House")]
+        result = Property.search_facets(domain)
+        self.assertEqual(result["facets"]["tag_ids"], {tag.id: 1})
+        self.assertEqual(result["facets"]["property_type_id"], {property_type.id: 1})
+
+        tag.unlink()
+        property_type.unlink()
+
+        result = Property.search_facets(domain)
+        self.assertEqual(result["facets"]["tag_ids"], {})
+        self.assertEqual(result["facets"]["property_type_id"], {False: 1})
+
+    def test_18_accept_highest_offer_in_batch(self):
+        """Тест: лучший оффер принимается сразу для нескольких объектов, остальные отклоняются"""
+        Property = self.env["estate.property"].with_context(estate_skip_seed_offers=True)
+        properties = Property.create(
+            [{"name": "Auction Lot 1", "expected_price": 1000}, {"name": "Auction Lot 2", "expected_price": 1000}]
+        )
+        other_partner = self.env["res.partner"].create({"name": "Other Buyer", "email": "other@test.com"})
+        offers = self.env["estate.property.offer"].create(
+            [
+                {"price": 900, "partner_id": other_partner.id, "property_id": properties[0].id},
+                {"price": 1100, "partner_id": self.test_partner.id, "property_id": properties[0].id},
+                {"price": 1200, "partner_id": other_partner.id, "property_id": properties[1].id},
+            ]
+        )
+
+        properties.action_accept_highest_offer()
+
+        self.assertEqual(offers.mapped("status"), ["refused", "accepted", "accepted"])
+        self.assertRecordValues(
+            properties,
+            [
+                {"state": "sold", "buyer_id": self.test_partner.id, "contact_email": "buyer@test.com"},
+                {"state": "sold", "buyer_id": other_partner.id, "contact_email": "other@test.com"},
+            ],
+        )
+
+        # правила проверяются для каждого объекта
+        with self.assertRaises(UserError):
+            properties[0].action_accept_highest_offer()
+        with self.assertRaises(UserError):
+            Property.create({"name": "No Offers", "expected_price": 1000}).action_accept_highest_offer()
+
+    def test_19_search_similar(self):
+        """Тест: поиск похожих объектов по названию, описанию и индексу"""
+        Property = self.env["estate.property"].with_context(estate_skip_seed_offers=True)
+        cottages = Property.create(
+            [
+                {"name": "Sunny Cottage", "expected_price": 1000},
+                {"name": "Lake House", "description": "Cozy cottage by the lake", "expected_price": 1000},
+            ]
+        )
+
+        found = Property.search_similar("Cottage")
+
+        self.assertEqual(found & cottages, cottages)
+        self.assertFalse(found & self.properties)
+
+    def test_20_search_facets(self):
+        """Тест: фасетный поиск возвращает страницу записей и счетчики по всем фасетам"""
+        Property = self.env["estate.property"].with_context(estate_skip_seed_offers=True)
+        tag = self.env["estate.property.tag"].create({"name": "Facet Tag"})
+        properties = Property.create(
+            [
+                {"name": "Facet House 1", "expected_price": 90000, "bedrooms": 2, "tag_ids": [(4, tag.id)]},
+                {"name": "Facet House 2", "expected_price": 300000, "bedrooms": 2},
+                {"name": "Facet House 3", "expected_price": 2000000, "bedrooms": 4},
+            ]
+        )
+        domain = [("name", "like", "Facet House")]
+
+        result = Property.search_facets(domain, limit=2, order="expected_price")
+
+        self.assertEqual(result["ids"], properties[:2].ids)
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(result["facets"]["state"], {"new": 3})
+        self.assertEqual(result["facets"]["bedrooms"], {2: 2, 4: 1})
+        self.assertEqual(result["facets"]["tag_ids"], {tag.id: 1})
+        self.assertEqual([band["count"] for band in result["facets"]["price_band"]], [1, 0, 1, 0, 1])
+
+        # закэшированный результат сбрасывается при изменении недвижимости
+        queries_before = self.cr.sql_log_count
+        Property.search_facets(domain, limit=2, order="expected_price")
+        self.assertEqual(self.cr.sql_log_count - queries_before, 1)
+
+        properties[2].state = "cancelled"
+        result = Property.search_facets(domain, limit=2, order="expected_price")
+        self.assertEqual(result["facets"]["state"], {"new": 2, "cancelled": 1})
+
+    def test_21_stored_area_and_age(self):
+        """Тест: площадь и возраст хранятся в базе, по ним можно сортировать и группировать"""
+        Property = self.env["estate.property"]
+        current_year = fields.Date.today().year
+        self.properties.construction_year = current_year - 10
+
+        self.assertEqual(self.properties.mapped("age"), [10, 10, 10])
+        self.assertEqual(
+            Property.search([("id", "in", self.properties.ids)], order="total_area desc"),
+            self.properties[1] + self.properties[0] + self.properties[2],
+        )
+        groups = Property._read_group([("id", "in", self.properties.ids)], ["age"], ["total_area:sum"])
+        self.assertEqual(groups, [(10, 730)])
+
+        # площадь пересчитывается вместе с ценой за квадратный метр
+        self.properties[0].living_area = 150
+        self.assertEqual(self.properties[0].total_area, 200)
+        self.assertEqual(self.properties[0].price_per_sqm, 500)
+
+        # ежегодный крон сдвигает возраст одним запросом
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE estate_property SET age = 0 WHERE id IN %s", [tuple(self.properties.ids)])
+        self.env.invalidate_all()
+        Property._cron_update_ages()
+        self.assertEqual(self.properties.mapped("age"), [10, 10, 10])
+
+    def test_22_copy_resets_offer_aggregates(self):
+        """Тест: копия недвижимости не наследует агрегаты офферов оригинала"""
+        villa = self.properties[1]
+
+        copy = villa.copy()
+
+        self.assertRecordValues(copy, [{"offer_count": 1, "best_price": villa.expected_price}])
+        self.assertEqual(copy.average_offer_price, villa.expected_price)
+        self.assertFalse(self.env["estate.property"].check_offer_aggregates() & (villa + copy))
+
+    def test_23_backfill_sold_date(self):
+        """Тест: недвижимость, проданная без даты продажи, получает дату при обновлении модуля"""
+        apartment = self.properties[2]
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE estate_property SET sold_date = NULL WHERE id = %s", [apartment.id])
+        apartment.invalidate_recordset(["sold_date"])
+
+        self.env["estate.property"].init()
+
+        self.assertEqual(apartment.sold_date, apartment.write_date.date())
+
+    def test_24_search_facets_after_rollback(self):
+        """Тест: результаты транзакции, откатившей изменения, не попадают к другим транзакциям"""
+        domain = [("name", "=", "Phantom Facet House")]
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            Property = env["estate.property"].with_context(estate_skip_seed_offers=True)
+            Property.create({"name": "Phantom Facet House", "expected_price": 1000})
+            self.assertEqual(Property.search_facets(domain)["total"], 1)
+            cr.rollback()
+
+        # транзакция без изменений использует общий кэш
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            self.assertEqual(env["estate.property"].search_facets(domain)["total"], 0)
+
+    def test_25_offer_report_pdf_in_chunks(self):
+        """Тест: PDF-отчет по офферам для большого выбора собирается из частей"""
+        properties = (
+            self.env["estate.property"]
+            .with_context(estate_skip_seed_offers=True)
+            .create([{"name": f"Printed House {i}", "expected_price": 1000} for i in range(150)])
+        )
+        with file_open("base/tests/minimal.pdf", "rb") as file:
+            chunk_pdf = file.read()
+        rendered_chunks = []
+
+        def render_chunk(report, report_ref, res_ids=None, data=None):
+            rendered_chunks.append(res_ids)
+            return chunk_pdf, "pdf"
+
+        with patch.object(IrActionsReport, "_render_qweb_pdf", render_chunk):
+            pdf, _format = self.env["ir.actions.report"]._render_qweb_pdf(
+                "estate.report_property_offers", properties.ids
+            )
+
+        self.assertEqual(rendered_chunks, [properties.ids[:100], properties.ids[100:]])
+        self.assertEqual(len(PdfFileReader(io.BytesIO(pdf)).pages), 2)
+
+    def test_26_mass_update_whole_domain(self):
+        """Тест: при выборе всех записей мастер хранит домен, а не список идентификаторов"""
+        self.env["ir.config_parameter"].sudo().set_param("web.active_ids_limit", 2)
+        domain = [("name", "in", ["Small House", "Big Villa", "Apartment"])]
+        Wizard = self.env["estate.property.mass.update.wizard"]
+
+        wizard = Wizard.with_context(active_ids=self.properties[:2].ids, active_domain=domain).create({})
+        self.assertEqual(wizard.property_domain, repr(domain))
+        self.assertEqual(wizard.property_count, 3)
+
+        wizard = Wizard.with_context(active_ids=self.properties[:1].ids, active_domain=domain).create({})
+        self.assertEqual(wizard.property_count, 1)
+
+    def test_27_top_report_cache_fingerprint(self):
+        """Тест: кэш отчета о топ-недвижимости не отдается после изменения продавца или шаблона"""
+        report = self.env["report.estate.report_property_top"]
+        renders = []
+        # все записи теста имеют одинаковую дату изменения транзакции, сдвигаем существующие в прошлое
+        self.env.flush_all()
+        for table in ("estate_property", "res_users", "res_partner", "res_company", "ir_ui_view"):
+            self.env.cr.execute(SQL("UPDATE %s SET write_date = write_date - INTERVAL '1 hour'", SQL.identifier(table)))
+        self.env.invalidate_all()
+
+        def render():
+            renders.append(True)
+            return b"%PDF-1.4"
+
+        report._get_cached_pdf(render)
+        report._get_cached_pdf(render)
+        self.assertEqual(len(renders), 1)
+
+        # изменение имени продавца не проходит через запись недвижимости
+        salesman = self.properties.salesman_id[:1]
+        salesman.partner_id.name = "Renamed Salesman"
+        report._get_cached_pdf(render)
+        self.assertEqual(len(renders), 2)
+
+        self.env.ref("estate.report_property_top").priority += 1
+        report._get_cached_pdf(render)
+        self.assertEqual(len(renders), 3)
+        self.assertEqual(self.env["ir.attachment"].sudo().search_count([("res_model", "=", report._name)]), 1)
@@ -1,6 +1,8 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 from odoo import fields
+from odoo.exceptions import UserError, ValidationError
 from odoo.tests import tagged
 from odoo.tests.common import TransactionCase
 
@@ -106,3 +108,237 @@ class EstatePropertyOfferTestCase(TransactionCase):
         expected_deadline = fields.Date.today() + timedelta(days=7)
 
         self.assertEqual(values["date_deadline"], expected_deadline, "date_deadline must be equal today + validity")
+
+    def _count_create_queries(self, batch_size):
+        """Считаем количество SQL-запросов при создании пакета офферов"""
+        partners = self.env["res.partner"].create([{"name": f"Bulk Buyer {i}"} for i in range(batch_size)])
+        properties = self.env["estate.property"].create(
+            [{"name": f"Bulk Villa {i}", "expected_price": 1000, "living_area": 50} for i in range(batch_size)]
+        )
+        vals_list = [
+            {
+                "price": 2000 + i,
+                "partner_id": partner.id,
+                "status": "received",
+                "property_id": property.id,
+            }
+            for i, (partner, property) in enumerate(zip(partners, properties, strict=True))
+        ]
+        self.env.flush_all()
+        self.env.invalidate_all()
+
+        start = self.cr.sql_log_count
+        self.env["estate.property.offer"].create(vals_list)
+        self.env.flush_all()
+        return self.cr.sql_log_count - start
+
+    def test_05_create_batch_query_count(self):
+        """Тест: проверка цены и смена статуса недвижимости не зависят от размера пакета"""
+        small_batch = self._count_create_queries(5)
+        big_batch = self._count_create_queries(20)
+
+        self.assertEqual(big_batch, small_batch, "Creating offers must not cost extra queries per offer")
+
+    def test_06_create_batch_checks_previous_offers(self):
+        """Тест: оффер сравнивается с более ранними офферами из того же пакета"""
+        other_partner = self.env["res.partner"].create({"name": "Other Buyer"})
+
+        with self.assertRaises(UserError):
+            self.env["estate.property.offer"].create(
+                [
+                    {
+                        "price": 200000,
+                        "partner_id": self.test_partner.id,
+                        "status": "received",
+                        "property_id": self.test_property.id,
+                    },
+                    {
+                        "price": 150000,
+                        "partner_id": other_partner.id,
+                        "status": "received",
+                        "property_id": self.test_property.id,
+                    },
+                ]
+            )
+
+    def test_07_create_sets_offer_received(self):
+        """Тест: полученный оффер переводит недвижимость в статус offer_received"""
+        other_partner = self.env["res.partner"].create({"name": "Other Buyer"})
+
+        self.env["estate.property.offer"].create(
+            {
+                "price": 200000,
+                "partner_id": other_partner.id,
+                "status": "received",
+                "property_id": self.test_property.id,
+            }
+        )
+
+        self.assertEqual(self.test_property.state, "offer_received")
+
+    def test_08_check_unique_offer(self):
+        """Тест: один покупатель не может сделать два активных оффера на одну недвижимость"""
+        other_partner = self.env["res.partner"].create({"name": "Other Buyer"})
+
+        with self.assertRaises(ValidationError):
+            self.env["estate.property.offer"].create(
+                [
+                    {"price": 200000, "partner_id": other_partner.id, "property_id": self.test_property.id},
+                    {"price": 210000, "partner_id": other_partner.id, "property_id": self.test_property.id},
+                ]
+            )
+
+    def test_09_refused_offers_are_not_duplicates(self):
+        """Тест: отклоненные офферы не мешают сделать новый оффер"""
+        offer = self.env["estate.property.offer"].create(
+            {"price": 200000, "partner_id": self.test_partner.id, "property_id": self.test_property.id}
+        )
+
+        self.assertEqual(offer.status, "draft")
+
+    def _count_list_read_queries(self, offers):
+        """Считаем количество SQL-запросов при чтении списка офферов"""
+        self.env.invalidate_all()
+        start = self.cr.sql_log_count
+        offers.read(["price", "partner_id", "validity", "date_deadline", "status", "has_activity"])
+        return self.cr.sql_log_count - start
+
+    def test_10_has_activity_query_count(self):
+        """Тест: has_activity вычисляется одним запросом для всего списка"""
+        partners = self.env["res.partner"].create([{"name": f"List Buyer {i}"} for i in range(20)])
+        offers = self.env["estate.property.offer"].create(
+            [
+                {"price": 1000 + i, "partner_id": p.id, "property_id": self.test_property.id}
+                for i, p in enumerate(partners)
+            ]
+        )
+        offers[:10].activity_schedule("mail.mail_activity_data_todo", user_id=self.env.user.id)
+        self.env.flush_all()
+
+        self.assertEqual(
+            self._count_list_read_queries(offers[:5]),
+            self._count_list_read_queries(offers),
+            "Reading has_activity must not cost extra queries per offer",
+        )
+        self.assertEqual(offers.mapped("has_activity"), [True] * 10 + [False] * 10)
+
+    def test_11_search_has_activity(self):
+        """Тест: поиск офферов с активностями и без"""
+        self.offer[0].activity_schedule("mail.mail_activity_data_todo", user_id=self.env.user.id)
+        Offer = self.env["estate.property.offer"]
+
+        self.assertIn(self.offer[0], Offer.search([("has_activity", "=", True)]))
+        self.assertNotIn(self.offer[1], Offer.search([("has_activity", "=", True)]))
+        self.assertIn(self.offer[1], Offer.search([("has_activity", "=", False)]))
+
+    def test_12_old_offers_cron_drains_its_domain(self):
+        """Тест: крон старых офферов обрабатывает их пакетами без сохранения курсора"""
+        Offer = self.env["estate.property.offer"]
+        self.offer.write({"status": "draft"})
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE estate_property_offer SET create_date = NOW() - INTERVAL '10 days' WHERE id IN %s",
+            [tuple(self.offer.ids)],
+        )
+        self.offer.invalidate_recordset(["create_date"])
+
+        activity_counts = []
+        with patch.object(type(Offer), "_CRON_BATCH_SIZE", 1):
+            for _run in range(3):
+                Offer.check_old_offers_more_seven_days()
+                activity_counts.append(
+                    self.env["mail.activity"].search_count(
+                        [("res_model", "=", "estate.property.offer"), ("res_id", "in", self.offer.ids)]
+                    )
+                )
+
+        # один оффер за запуск, третий запуск не находит необработанных офферов
+        self.assertEqual(activity_counts, [1, 2, 2])
+
+    def test_13_follow_up_activities_are_idempotent(self):
+        """Тест: повторный запуск не создает повторные активности для оффера"""
+        Offer = self.env["estate.property.offer"]
+        offers = self.offer
+        offers.write({"status": "draft"})
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE estate_property_offer SET create_date = NOW() - INTERVAL '10 days' WHERE id IN %s",
+            [tuple(offers.ids)],
+        )
+        offers.invalidate_recordset(["create_date"])
+
+        Offer.check_old_offers_more_seven_days()
+        Offer.check_old_offers_more_seven_days()
+
+        activities = self.env["mail.activity"].search(
+            [("res_model", "=", "estate.property.offer"), ("res_id", "in", offers.ids)]
+        )
+        self.assertEqual(len(activities), len(offers))
+        self.assertEqual(activities.user_id, self.test_property.salesman_id)
+
+    def test_14_update_price_old_offers_once(self):
+        """Тест: цена старого оффера повышается один раз, история цены сохраняется"""
+        other_partner = self.env["res.partner"].create({"name": "Other Buyer"})
+        old_offer = self.env["estate.property.offer"].create(
+            {
+                "price": 200000,
+                "partner_id": other_partner.id,
+                "property_id": self.test_property.id,
+                "date_create": fields.Date.today() - timedelta(days=40),
+            }
+        )
+
+        self.env["estate.property.offer"].update_price_old_offers()
+        self.env["estate.property.offer"].update_price_old_offers()
+
+        self.assertAlmostEqual(old_offer.price, 220000, places=2)
+        self.assertEqual(old_offer.date_price_escalated, fields.Date.today())
+        self.assertRecordValues(old_offer.price_history_ids, [{"old_price": 200000, "new_price": old_offer.price}])
+        self.assertEqual(self.test_property.best_price, old_offer.price)
+
+    def test_15_check_expired_offers_by_deadline(self):
+        """Тест: оффер истекает по дате дедлайна, а не по дате создания"""
+        partners = self.env["res.partner"].create([{"name": "Late Buyer"}, {"name": "Early Buyer"}])
+        late_offer, open_offer = self.env["estate.property.offer"].create(
+            [
+                {"price": 200000, "partner_id": partners[0].id, "property_id": self.test_property.id},
+                {"price": 210000, "partner_id": partners[1].id, "property_id": self.test_property.id},
+            ]
+        )
+        late_offer.date_deadline = fields.Date.today() - timedelta(days=1)
+
+        self.env["estate.property.offer"].check_expired_offers()
+
+        self.assertEqual(late_offer.status, "expired")
+        self.assertEqual(open_offer.status, "draft")
+
+    def test_16_accept_only_one_offer(self):
+        """Тест: второй оффер нельзя принять, пока на недвижимость уже принят другой"""
+        self.offer[0].action_accept()
+
+        with self.assertRaises(UserError):
+            self.offer[1].action_accept()
+        self.assertEqual(self.offer.mapped("status"), ["accepted", "refused"])
+
+    def test_17_create_batch_refused_offer_below_accepted(self):
+        """Тест: отклоненный оффер из того же пакета не сравнивается с принятым"""
+        other_partner = self.env["res.partner"].create({"name": "Other Buyer"})
+
+        offers = self.env["estate.property.offer"].create(
+            [
+                {
+                    "price": 200000,
+                    "partner_id": other_partner.id,
+                    "status": "accepted",
+                    "property_id": self.test_property.id,
+                },
+                {
+                    "price": 15000,
+                    "partner_id": self.test_partner.id,
+                    "status": "refused",
+                    "property_id": self.test_property.id,
+                },
+            ]
+        )
+
+        self.assertEqual(offers.mapped("status"), ["accepted", "refused"])
@@ -66,3 +66,22 @@ class EstatePropertyTypeTestCase(TransactionCase):
             expected_count,
             "offer_count типа недвижимости должен равняться числу всех связанных offer_ids",
         )
+
+    def test_02_compute_stats(self):
+        # проверка статистики офферов и недвижимости по статусам для типа недвижимости
+
+        offers = self.property_type.offer_ids
+
+        self.assertRecordValues(
+            self.property_type,
+            [
+                {
+                    "offer_count": len(offers),
+                    "offer_avg_price": sum(offers.mapped("price")) / len(offers),
+                    "offer_max_price": max(offers.mapped("price")),
+                    "property_new_count": 1,
+                    "property_offer_received_count": 0,
+                    "property_sold_count": 0,
+                }
+            ],
+        )
@@ -0,0 +1,60 @@
+import base64
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged("post_install", "-at_install")
+class EstateSoldReportTestCase(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        buyer = cls.env["res.partner"].create({"name": "Report Buyer", "email": "report@test.com"})
+        cls.env["estate.property"].with_context(estate_skip_seed_offers=True).create(
+            {
+                "name": "Reported House",
+                "expected_price": 100000,
+                "selling_price": 95000,
+                "buyer_id": buyer.id,
+                "state": "sold",
+                "sold_date": fields.Date.today(),
+            }
+        )
+
+        today = fields.Date.today()
+        cls.reports = cls.env["estate.sold.report"].create(
+            [
+                {"date_from": today, "date_to": today, "export_format": "csv"},
+                {"date_from": today, "date_to": today, "export_format": "csv"},
+            ]
+        )
+
+    def test_01_export_csv_attachment(self):
+        """Тест: CSV-выгрузка сохраняется вложением мастера без индексации содержимого"""
+        attachment = self.reports[0]._generate_export_attachment()
+
+        content = base64.b64decode(attachment.datas).decode()
+        self.assertIn("Reported House", content)
+        self.assertEqual(attachment.file_size, len(content.encode()))
+        self.assertNotIn("Reported House", attachment.index_content or "")
+        self.assertRecordValues(attachment, [{"res_model": "estate.sold.report", "res_id": self.reports[0].id}])
+
+    def test_02_failed_background_export(self):
+        """Тест: ошибка одной выгрузки отмечает ее как неудачную и не блокирует следующую"""
+        Report = self.env["estate.sold.report"]
+        self.reports.write({"export_state": "pending"})
+        generate = type(Report)._generate_export_attachment
+
+        def generate_or_fail(report):
+            if report == self.reports[0]:
+                raise ValueError("broken export")
+            return generate(report)
+
+        with patch.object(type(Report), "_generate_export_attachment", generate_or_fail):
+            Report._cron_generate_exports()
+            Report._cron_generate_exports()
+
+        self.assertEqual(self.reports.mapped("export_state"), ["failed", "done"])
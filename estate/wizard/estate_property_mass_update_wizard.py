@@ -1,9 +1,17 @@
-from odoo import api, fields, models
+import ast
+
+from odoo import _, api, fields, models
+from odoo.osv import expression
+from odoo.tools import html_escape
 
 
 class EstatePropertyMassUpdateWizard(models.TransientModel):
     _name = "estate.property.mass.update.wizard"
     _description = "Wizard: Mass Update Estate Property Status"
+    # background updates of large selections can outlive the default transient lifetime
+    _transient_max_hours = 24.0
+
+    _BATCH_SIZE = 1000
 
     state = fields.Selection(
         selection=[
@@ -19,22 +27,98 @@ class EstatePropertyMassUpdateWizard(models.TransientModel):
         string="Status",
     )
 
-    property_ids = fields.Many2many(
-        "estate.property",
-        string="Properties",
-        readonly=True,
+    # matches nothing until the selection is known
+    property_domain = fields.Char(default=repr(expression.FALSE_DOMAIN), readonly=True)
+    property_count = fields.Integer(string="Properties", compute="_compute_property_count")
+    fold_tracking = fields.Boolean(
+        string="Summarize Tracking",
+        help="Log a plain status note on the properties, in one insert per batch, instead of tracking each change.",
     )
 
+    job_state = fields.Selection(selection=[("pending", "Pending"), ("done", "Done")], readonly=True)
+    last_property_id = fields.Integer(readonly=True)
+    processed_count = fields.Integer(readonly=True)
+
     @api.model
     def default_get(self, fields_list):
         res = super().default_get(fields_list)
-        active_ids = self.env.context.get("active_ids", [])
-        if active_ids:
-            res["property_ids"] = [(6, 0, active_ids)]
+        context = self.env.context
+        active_ids = context.get("active_ids", [])
+        # the web client sends at most web.active_ids_limit ids when the whole domain is selected
+        active_ids_limit = int(self.env["ir.config_parameter"].sudo().get_param("web.active_ids_limit", 20000))
+        if context.get("active_domain") is not None and (len(active_ids) >= active_ids_limit or not active_ids):
+            res["property_domain"] = repr(context["active_domain"])
+        elif active_ids:
+            res["property_domain"] = repr([("id", "in", active_ids)])
         return res
 
+    def _get_property_domain(self):
+        return ast.literal_eval(self.property_domain or repr(expression.FALSE_DOMAIN))
+
+    @api.depends("property_domain")
+    def _compute_property_count(self):
+        for wizard in self:
+            wizard.property_count = self.env["estate.property"].search_count(wizard._get_property_domain())
+
+    def _process_batch(self):
+        """Update the next batch of properties after ``last_property_id``; return the number of properties left."""
+        self.ensure_one()
+        domain = [*self._get_property_domain(), ("id", ">", self.last_property_id)]
+        properties = self.env["estate.property"].search(domain, order="id", limit=self._BATCH_SIZE)
+
+        if self.fold_tracking:
+            properties.with_context(tracking_disable=True).write({"state": self.state})
+            state_label = dict(self._fields["state"]._description_selection(self.env))[self.state]
+            properties._message_log_batch(
+                bodies={
+                    prop.id: _("Status set to %s by a mass update.", html_escape(state_label)) for prop in properties
+                },
+            )
+        else:
+            properties.write({"state": self.state})
+
+        remaining = self.env["estate.property"].search_count(domain) - len(properties)
+        self.write(
+            {
+                "last_property_id": properties[-1:].id or self.last_property_id,
+                "processed_count": self.processed_count + len(properties),
+                "job_state": "pending" if remaining else "done",
+            }
+        )
+        return remaining
+
     def action_apply(self):
-        active_ids = self.env.context.get("active_ids", [])
-        if active_ids:
-            self.env["estate.property"].browse(active_ids).write({"state": self.state})
+        self.ensure_one()
+        threshold = int(
+            self.env["ir.config_parameter"].sudo().get_param("estate.mass_update_background_threshold", 1000)
+        )
+        if self.property_count > threshold:
+            self.job_state = "pending"
+            self.env.ref("estate.estate_property_mass_update_cron").sudo()._trigger()
+            return {
+                "type": "ir.actions.client",
+                "tag": "display_notification",
+                "params": {
+                    "type": "info",
+                    "message": _("%s properties will be updated in the background.", self.property_count),
+                    "next": {"type": "ir.actions.act_window_close"},
+                },
+            }
+
+        while self._process_batch():
+            pass
         return {"type": "ir.actions.act_window_close"}
+
+    @api.model
+    def _cron_process_mass_updates(self):
+        """Process one batch of the oldest pending mass update and report the progress to the cron."""
+        pending = self.sudo().search([("job_state", "=", "pending")], order="id")
+        if not pending:
+            return
+        wizard = pending[0].with_user(pending[0].create_uid)
+        processed = wizard.processed_count
+        remaining = wizard._process_batch()
+        self.env["ir.cron"]._notify_progress(
+            done=wizard.processed_count - processed,
+            remaining=remaining + sum(w.property_count - w.processed_count for w in pending[1:]),
+        )
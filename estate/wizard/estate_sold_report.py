@@ -1,12 +1,17 @@
-import base64
+import csv
 import io
 import logging
+import tempfile
+from math import ceil
 
+from markupsafe import Markup
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 
-from odoo import _, fields, models
+from odoo import Command, _, api, fields, models
 from odoo.exceptions import UserError
+from odoo.tools import split_every
 
 _logger = logging.getLogger(__name__)
 
@@ -14,81 +19,61 @@ _logger = logging.getLogger(__name__)
 class EstateSoldReport(models.TransientModel):
     _name = "estate.sold.report"
     _description = "Estate Sold Report"
+    # the export attachments live as long as the wizard, leave the users time to download them
+    _transient_max_hours = 24.0
+
+    _PREVIEW_PAGE_SIZE = 80
+    _ROW_FIELDS = ["property_id", "buyer_id", "selling_price", "salesman_id", "sold_date"]
+    _EXPORT_BATCH_SIZE = 2000
+    _EXPORT_HEADERS = ["Property", "Buyer", "Price", "Agent", "Sold Date"]
+    _EXPORT_MIMETYPES = {
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        # not text/*, which ir.attachment would copy whole into index_content
+        "csv": "application/csv",
+    }
 
     date_from = fields.Date(required=True)
     date_to = fields.Date(required=True)
     sold_property_ids = fields.One2many("estate.sold.report.line", "report_id", string="Sold Properties")
 
-    file_data = fields.Binary(readonly=True)
-    file_name = fields.Char()
+    export_format = fields.Selection(
+        selection=[("xlsx", "Excel (XLSX)"), ("csv", "CSV")], default="xlsx", required=True
+    )
+    export_state = fields.Selection(
+        selection=[("pending", "Pending"), ("done", "Done"), ("failed", "Failed")], readonly=True
+    )
     html_preview = fields.Html(sanitize=False)
 
-    def action_generate_report(self):
-        self.ensure_one()
-        sold_properties = self.env["estate.property"].search(
-            [
-                ("state", "=", "sold"),
-                ("write_date", ">=", self.date_from),
-                ("write_date", "<=", self.date_to),
-            ]
+    page = fields.Integer(default=1)
+    page_count = fields.Integer()
+    total_count = fields.Integer(string="Sold Properties Found")
+
+    def _get_sold_domain(self):
+        return [("sold_date", ">=", self.date_from), ("sold_date", "<=", self.date_to)]
+
+    def _read_sold_rows(self, offset=0, limit=None):
+        """Read sold properties as plain rows, with the property, buyer and salesman names joined in the same pass."""
+        return self.env["estate.property.sale.analysis"].search_read(
+            self._get_sold_domain(), self._ROW_FIELDS, offset=offset, limit=limit
         )
-        lines = []
-        for record in sold_properties:
-            lines.append(
-                (
-                    0,
-                    0,
-                    {
-                        "property_id": record.id,
-                        "buyer_id": record.buyer_id.id,
-                        "selling_price": record.selling_price,
-                        "salesperson_id": record.salesman_id.id,
-                        "sold_date": record.write_date,
-                    },
-                )
-            )
-        self.write({"sold_property_ids": lines})
-
-        # """create HTML table for preview"""
-        html = ""
-        if sold_properties:
-            html = """
-            <table class="table-sm table-bordered" style="margin-top:10px; border-collapse: collapse;">
-                <thead style="background-color: #f4f4f4; font-weight: bold;">
-                    <tr>
-                        <th>Property</th>
-                        <th>Buyer</th>
-                        <th>Price</th>
-                        <th>Agent</th>
-                        <th>Sold Date</th>
-                    </tr>
-                </thead>
-                <tbody>
-            """
-
-            for rec in sold_properties:
-                sold_str = ""
-                if rec.write_date:
-                    dt_value = rec.write_date
-                    if isinstance(dt_value, str):
-                        dt_value = fields.Datetime.from_string(dt_value)
-                    local_dt = fields.Datetime.context_timestamp(self, dt_value)
-                    sold_str = local_dt.strftime("%Y-%m-%d %H:%M")
-                html += f"""
-                <tr>
-                    <td>{rec.name or ""}</td>
-                    <td>{rec.buyer_id.name or ""}</td>
-                    <td>{rec.selling_price or ""}</td>
-                    <td>{rec.salesman_id.name or ""}</td>
-                    <td>{sold_str or ""}</td>
-                </tr>
-                """
-            html += "</tbody></table>"
-        else:
-            html += "<p style='color:red;'>No sold properties found for the selected period.</p>"
 
-        self.html_preview = html
+    def _format_sold_date(self, sold_date):
+        return fields.Date.to_string(sold_date) or ""
+
+    def _render_preview(self):
+        rows = self._read_sold_rows(offset=(self.page - 1) * self._PREVIEW_PAGE_SIZE, limit=self._PREVIEW_PAGE_SIZE)
+        self.html_preview = self.env["ir.qweb"]._render(
+            "estate.sold_report_preview",
+            {
+                "rows": rows,
+                "format_sold_date": self._format_sold_date,
+                "page": self.page,
+                "page_count": self.page_count,
+                "total_count": self.total_count,
+            },
+        )
 
+    def _reopen(self):
         return {
             "type": "ir.actions.act_window",
             "res_model": "estate.sold.report",
@@ -97,78 +82,181 @@ class EstateSoldReport(models.TransientModel):
             "target": "new",
         }
 
-    def action_export_excel_file(self):
+    def action_generate_report(self):
         self.ensure_one()
+        total_count = self.env["estate.property.sale.analysis"].search_count(self._get_sold_domain())
+        self.write(
+            {
+                "sold_property_ids": [Command.clear()],
+                "total_count": total_count,
+                "page": 1,
+                "page_count": max(ceil(total_count / self._PREVIEW_PAGE_SIZE), 1),
+            }
+        )
+        self._render_preview()
+        return self._reopen()
+
+    def action_next_page(self):
+        self.ensure_one()
+        self.page = min(self.page + 1, self.page_count)
+        self._render_preview()
+        return self._reopen()
 
+    def action_previous_page(self):
+        self.ensure_one()
+        self.page = max(self.page - 1, 1)
+        self._render_preview()
+        return self._reopen()
+
+    def action_show_lines(self):
+        """Materialize the report lines, only when the user drills into them."""
+        self.ensure_one()
         if not self.sold_property_ids:
-            raise UserError(_("No data to export. Please generate the report first."))
+            self._materialize_lines()
+        return self._reopen()
 
-        try:
-            # """create a book and sheet for excel"""
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Sold Properties"
-
-            # """create headers"""
-            headers = ["Property", "Buyer", "Price", "Agent", "Sold Date"]
-            ws.append(headers)
-
-            # """make the title bold"""
-            bold = Font(bold=True)
-            for cell in ws[1]:
-                cell.font = bold
-
-            # """write data by lines wizard"""
-            for line in self.sold_property_ids:
-                # """local time user"""
-                sold_str = ""
-                if line.sold_date:
-                    try:
-                        dt_value = line.sold_date
-                        if isinstance(dt_value, str):
-                            dt_value = fields.Datetime.from_string(dt_value)
-
-                        local_dt = fields.Datetime.context_timestamp(self, dt_value)
-
-                        sold_str = local_dt.strftime("%Y-%m-%d %H:%M")
-                    except (TypeError, ValueError, AttributeError):
-                        sold_str = str(line.sold_date)
-
-                row = [
-                    line.property_id.name or "",
-                    line.buyer_id.name or "",
-                    float(line.selling_price or 0.0),
-                    line.salesperson_id.name or "",
-                    sold_str,
+    def _materialize_lines(self):
+        self.env["estate.sold.report.line"].create(
+            [
+                {
+                    "report_id": self.id,
+                    "property_id": row["property_id"][0],
+                    "buyer_id": row["buyer_id"] and row["buyer_id"][0],
+                    "selling_price": row["selling_price"],
+                    "salesperson_id": row["salesman_id"] and row["salesman_id"][0],
+                    "sold_date": row["sold_date"],
+                }
+                for row in self._read_sold_rows()
+            ]
+        )
+
+    def _iter_export_rows(self):
+        """Yield the export rows batch by batch, keeping only one batch of records in the cache."""
+        SaleAnalysis = self.env["estate.property.sale.analysis"]
+        sales = SaleAnalysis.search(self._get_sold_domain())
+        for batch_ids in split_every(self._EXPORT_BATCH_SIZE, sales.ids):
+            for row in SaleAnalysis.browse(batch_ids).read(self._ROW_FIELDS):
+                yield [
+                    row["property_id"][1],
+                    row["buyer_id"] and row["buyer_id"][1] or "",
+                    float(row["selling_price"] or 0.0),
+                    row["salesman_id"] and row["salesman_id"][1] or "",
+                    self._format_sold_date(row["sold_date"]),
                 ]
-                ws.append(row)
+            self.env.invalidate_all()
 
-            # """save"""
-            stream = io.BytesIO()
-            wb.save(stream)
+    def _write_xlsx(self, stream):
+        # write-only workbooks stream the rows to disk instead of keeping every cell in memory
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sold Properties")
+
+        bold = Font(bold=True)
+        headers = []
+        for title in self._EXPORT_HEADERS:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.font = bold
+            headers.append(cell)
+        ws.append(headers)
+
+        for row in self._iter_export_rows():
+            ws.append(row)
+        wb.save(stream)
+
+    def _write_csv(self, stream):
+        text_stream = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+        writer = csv.writer(text_stream)
+        writer.writerow(self._EXPORT_HEADERS)
+        writer.writerows(self._iter_export_rows())
+        text_stream.flush()
+        text_stream.detach()
+
+    def _generate_export_attachment(self):
+        self.ensure_one()
+        file_name = f"sold_properties_{self.date_from}_{self.date_to}.{self.export_format}"
+        with tempfile.TemporaryFile() as stream:
+            if self.export_format == "csv":
+                self._write_csv(stream)
+            else:
+                self._write_xlsx(stream)
             stream.seek(0)
-            data = stream.getvalue()
+            return self._create_export_attachment(stream, file_name)
 
-            # """Encode in base64 and write to the wizard fields"""
-            file_base64 = base64.b64encode(data)
-            file_name = f"sold_properties_{self.date_from}_{self.date_to}.xlsx"
-            self.write(
-                {
-                    "file_data": file_base64,
-                    "file_name": file_name,
-                }
-            )
-            return {
-                "type": "ir.actions.act_url",
-                "url": f"/web/content/?model="
-                f"{self._name}&id={self.id}&field=file_data&filename_field=file_name&download=false",
-                "target": "new",
+    def _create_export_attachment(self, stream, file_name):
+        """Create the attachment of the export file in ``stream``, linked to the wizard so that the transient
+        vacuum removes it with the wizard. The file is read in memory once, to be handed over to ir.attachment.
+        """
+        return self.env["ir.attachment"].create(
+            {
+                "name": file_name,
+                "raw": stream.read(),
+                "mimetype": self._EXPORT_MIMETYPES[self.export_format],
+                "res_model": self._name,
+                "res_id": self.id,
             }
+        )
+
+    def action_export_excel_file(self):
+        self.ensure_one()
+
+        if not self.env["estate.property.sale.analysis"].search_count(self._get_sold_domain(), limit=1):
+            raise UserError(_("No data to export. Please check the selected period."))
 
+        try:
+            attachment = self._generate_export_attachment()
         except Exception as e:
-            _logger.exception("Export to XLSX failed: %s", e)
-            raise UserError(_("Failed to generate Excel file: {}").format(e)) from e
+            _logger.exception("Export of the sold report failed: %s", e)
+            raise UserError(_("Failed to generate the export file: {}").format(e)) from e
 
-        # except Exception as e:
-        #     _logger.exception("Export to XLSX failed")
-        #     raise UserError(_("Failed to generate Excel file: %s", e))
+        return {
+            "type": "ir.actions.act_url",
+            "url": f"/web/content/{attachment.id}?download=true",
+            "target": "new",
+        }
+
+    def action_export_background(self):
+        self.ensure_one()
+        self.export_state = "pending"
+        self.env.ref("estate.estate_sold_report_export_cron").sudo()._trigger()
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "type": "info",
+                "message": _("The export is being generated. You will be notified when the file is ready."),
+                "next": {"type": "ir.actions.act_window_close"},
+            },
+        }
+
+    @api.model
+    def _cron_generate_exports(self):
+        """Generate the oldest pending export and report the progress to the cron, which calls again while some
+        remain. A failing export is marked as failed instead of blocking the ones queued after it."""
+        pending = self.sudo().search([("export_state", "=", "pending")], order="id")
+        if not pending:
+            return
+        report = pending[0]
+        user = report.create_uid
+        try:
+            with self.env.cr.savepoint():
+                # generated as the requesting user, so their access rules apply
+                attachment = report.with_user(user)._generate_export_attachment()
+        except Exception:
+            _logger.exception("Background export of the sold report %s failed", report.id)
+            report.export_state = "failed"
+            user.partner_id.message_notify(
+                partner_ids=user.partner_id.ids,
+                subject=_("Sold properties export failed"),
+                body=_(
+                    "The export of the sold properties from %(date_from)s to %(date_to)s could not be generated.",
+                    date_from=report.date_from,
+                    date_to=report.date_to,
+                ),
+            )
+        else:
+            report.export_state = "done"
+            user.partner_id.message_notify(
+                partner_ids=user.partner_id.ids,
+                subject=_("Sold properties export ready"),
+                body=Markup('<a href="/web/content/%s?download=true">%s</a>') % (attachment.id, attachment.name),
+            )
+        self.env["ir.cron"]._notify_progress(done=1, remaining=len(pending) - 1)
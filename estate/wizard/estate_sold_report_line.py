@@ -10,4 +10,4 @@ class EstateSoldReportLine(models.TransientModel):
     buyer_id = fields.Many2one("res.partner", string="Buyer")
     selling_price = fields.Float()
     salesperson_id = fields.Many2one("res.users", string="Agent")
-    sold_date = fields.Datetime()
+    sold_date = fields.Date()
@@ -7,6 +7,7 @@
     "installable": True,
     "application": False,
     "data": [
+        "data/estate_account_cron.xml",
         "views/account_move_view.xml",
         "report/estate_account_template.xml",
     ],
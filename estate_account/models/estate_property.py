@@ -1,45 +1,71 @@
-from odoo import Command, models
+from odoo import Command, api, fields, models
+from odoo.tools import str2bool
 
 
 class EstateProperty(models.Model):
     _inherit = "estate.property"
 
+    commission_invoice_pending = fields.Boolean(copy=False, index=True)
+
+    _COMMISSION_INVOICE_BATCH_SIZE = 500
+
     def estate_property_action_sold(self):
         result = super().estate_property_action_sold()
-        for property in self:
-            property_name = property.name
-            commission = property.selling_price * 0.06 if property.selling_price else 0.0
-            admin_fee = 100.0
-
-            move_vals = {
-                "partner_id": property.buyer_id.id,
-                "move_type": "out_invoice",
-                "invoice_line_ids": [
-                    Command.create(
-                        {
-                            "name": f" {property_name} (commission 6% of sale price)",
-                            "quantity": 1,
-                            "price_unit": commission,
-                        }
-                    ),
-                    Command.create(
-                        {
-                            "name": "Administrative fee",
-                            "quantity": 1,
-                            "price_unit": admin_fee,
-                        }
-                    ),
-                    Command.create(
-                        {
-                            "name": f" {property_name} (sale price)",
-                            "quantity": 1,
-                            "price_unit": property.selling_price,
-                        }
-                    ),
-                ],
-            }
-
-            self.check_access("write")
-            self.env["account.move"].sudo().create(move_vals)
+        self.check_access("write")
+
+        defer = str2bool(
+            self.env["ir.config_parameter"].sudo().get_param("estate_account.defer_commission_invoices", "False")
+        )
+        if defer:
+            # the invoices are created by the cron, so the sale returns immediately
+            self.commission_invoice_pending = True
+            self.env.ref("estate_account.commission_invoice_cron").sudo()._trigger()
+        else:
+            self._create_commission_invoices()
 
         return result
+
+    def _prepare_commission_invoice_vals(self):
+        self.ensure_one()
+        commission = self.selling_price * 0.06 if self.selling_price else 0.0
+        admin_fee = 100.0
+
+        return {
+            "partner_id": self.buyer_id.id,
+            "company_id": self.company_id.id,
+            "move_type": "out_invoice",
+            "invoice_line_ids": [
+                Command.create(
+                    {
+                        "name": f" {self.name} (commission 6% of sale price)",
+                        "quantity": 1,
+                        "price_unit": commission,
+                    }
+                ),
+                Command.create(
+                    {
+                        "name": "Administrative fee",
+                        "quantity": 1,
+                        "price_unit": admin_fee,
+                    }
+                ),
+                Command.create(
+                    {
+                        "name": f" {self.name} (sale price)",
+                        "quantity": 1,
+                        "price_unit": self.selling_price,
+                    }
+                ),
+            ],
+        }
+
+    def _create_commission_invoices(self):
+        return self.env["account.move"].sudo().create([record._prepare_commission_invoice_vals() for record in self])
+
+    @api.model
+    def _cron_create_commission_invoices(self):
+        domain = [("commission_invoice_pending", "=", True)]
+        properties = self.sudo().search(domain, limit=self._COMMISSION_INVOICE_BATCH_SIZE)
+        properties._create_commission_invoices()
+        properties.commission_invoice_pending = False
+        self.env["ir.cron"]._notify_progress(done=len(properties), remaining=self.sudo().search_count(domain))
@@ -0,0 +1 @@
+from . import test_estate_account_benchmark
@@ -0,0 +1,53 @@
+import logging
+import time
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged("post_install", "-at_install", "-standard", "estate_benchmark")
+class EstateAccountBenchmarkTestCase(TransactionCase):
+    """Бенчмарк создания счетов при продаже, запускается отдельно: --test-tags estate_benchmark"""
+
+    SIZES = (1, 100, 1000)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.buyer = cls.env["res.partner"].create({"name": "Benchmark Buyer", "email": "buyer@test.com"})
+
+    def test_commission_invoices(self):
+        """Бенчмарк: продажа 1/100/1000 объектов недвижимости со счетами"""
+        invoice_count = 0
+        for size in self.SIZES:
+            properties = (
+                self.env["estate.property"]
+                .with_context(estate_skip_seed_offers=True)
+                .create(
+                    [
+                        {
+                            "name": f"Benchmark House {i}",
+                            "expected_price": 100000,
+                            "selling_price": 100000,
+                            "living_area": 50,
+                            "buyer_id": self.buyer.id,
+                        }
+                        for i in range(size)
+                    ]
+                )
+            )
+            self.env.flush_all()
+
+            start_queries = self.cr.sql_log_count
+            start_time = time.perf_counter()
+            properties.estate_property_action_sold()
+            self.env.flush_all()
+            queries = self.cr.sql_log_count - start_queries
+            duration = time.perf_counter() - start_time
+            _logger.info("Selling %s properties with invoices: %s queries, %.3fs", size, queries, duration)
+
+            invoice_count += size
+            self.assertEqual(self.env["account.move"].search_count([("partner_id", "=", self.buyer.id)]), invoice_count)